@@ -0,0 +1,146 @@
+"""Resident ABBYY engine workers.
+
+Starting the CommandLineInterface binary loads FREngine and its dictionaries on
+every call, which takes seconds before any page is recognized. A worker is a
+long-lived process that loads the engine once and then takes recognition jobs
+over its stdin/stdout, one JSON object per line:
+
+    worker -> {"ready": true}                       once the engine is loaded
+    server -> {"id": 1, "input": "/path/in.pdf", "output": "/path/out.xml",
+               "format": "XML", "mode": "Accurate"}
+    worker -> {"id": 1, "ok": true}                 or {"id": 1, "ok": false, "error": "..."}
+
+Set ABBYY_WORKER_CMD to the worker command line to enable it;
+scripts/fake_abbyy_worker.py speaks the same protocol for local testing.
+Workers that crash, hang or exit are restarted on the next job.
+"""
+import os
+import json
+import queue
+import shlex
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+ABBYY_WORKER_CMD = os.environ.get("ABBYY_WORKER_CMD", "")
+WORKER_STARTUP_TIMEOUT = int(os.environ.get("ABBYY_WORKER_STARTUP_TIMEOUT", "120"))
+WORKER_JOB_TIMEOUT = 300
+
+class WorkerError(Exception):
+    """The worker process died, hung or broke the protocol."""
+
+class AbbyyWorker:
+    """One supervised engine worker process; not safe for concurrent use."""
+
+    def __init__(self, command, env=None):
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        self.env = env
+        self.process = None
+        self.lines = None
+        self.next_id = 0
+        self.starts = 0
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding="utf-8", bufsize=1, env=self.env
+        )
+        self.starts += 1
+        # Reading on a separate thread lets every wait have a timeout.
+        self.lines = queue.Queue()
+        threading.Thread(
+            target=self._read_lines, args=(self.process.stdout, self.lines), daemon=True
+        ).start()
+        message = self._read(WORKER_STARTUP_TIMEOUT)
+        if not message.get("ready"):
+            raise WorkerError(f"Unexpected worker greeting: {message}")
+        logger.info(f"ABBYY worker {self.process.pid} ready")
+
+    @staticmethod
+    def _read_lines(stream, lines):
+        for line in stream:
+            lines.put(line)
+        lines.put(None)
+
+    def _read(self, timeout):
+        try:
+            line = self.lines.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerError(f"ABBYY worker did not answer within {timeout}s")
+        if line is None:
+            raise WorkerError(f"ABBYY worker exited with code {self.process.wait()}")
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise WorkerError(f"Malformed worker output: {line.strip()}")
+
+    def _send(self, request):
+        if self.process is None or self.process.poll() is not None:
+            self._start()
+        self.next_id += 1
+        request = dict(request, id=self.next_id)
+        try:
+            self.process.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"ABBYY worker is not accepting jobs: {e}")
+        while True:
+            response = self._read(WORKER_JOB_TIMEOUT)
+            if response.get("id") == request["id"]:
+                return response
+
+    def recognize(self, input_path, output_path, mode="Accurate", fmt="XML"):
+        """Recognize input_path into output_path; return None on success or an error message.
+
+        If the worker dies or hangs the job is retried once on a fresh worker.
+        """
+        request = {"input": input_path, "output": output_path, "format": fmt, "mode": mode}
+        for attempt in (1, 2):
+            try:
+                response = self._send(request)
+                return None if response.get("ok") else response.get("error", "unknown worker error")
+            except WorkerError as e:
+                logger.warning(f"ABBYY worker failed (attempt {attempt}): {e}")
+                self.stop()
+                if attempt == 2:
+                    raise
+
+    def stop(self):
+        """Terminate the worker process, if running."""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self.process = None
+
+_idle_workers = []
+_workers_lock = threading.Lock()
+
+@contextmanager
+def engine_worker(env=None):
+    """Check out an idle resident worker, starting a new one if none is free.
+
+    At most one worker per concurrent caller is ever created, so the ABBYY
+    thread pool's size also bounds the number of resident engines.
+    """
+    with _workers_lock:
+        worker = _idle_workers.pop() if _idle_workers else None
+    if worker is None:
+        worker = AbbyyWorker(ABBYY_WORKER_CMD, env=env)
+    try:
+        yield worker
+    finally:
+        with _workers_lock:
+            _idle_workers.append(worker)
+
+def stop_workers():
+    """Terminate all idle workers (e.g. at shutdown or in tests)."""
+    with _workers_lock:
+        workers = list(_idle_workers)
+        _idle_workers.clear()
+    for worker in workers:
+        worker.stop()
@@ -5,9 +5,8 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QTextEdit, QMessageBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QPixmap, QImage
-import pytesseract
-from pdf2image import convert_from_path
 import tempfile
+from ocr_pages import ocr_image_file, ocr_pdf
 
 class OCRWorker(QThread):
     progress = pyqtSignal(int)
@@ -21,15 +20,16 @@ class OCRWorker(QThread):
     def run(self):
         try:
             if self.file_path.lower().endswith('.pdf'):
-                # Convert PDF to images
-                images = convert_from_path(self.file_path)
-                text = ""
-                for i, image in enumerate(images):
-                    self.progress.emit(int((i + 1) / len(images) * 100))
-                    text += pytesseract.image_to_string(image, lang='heb+eng')
+                # OCR pages across the worker pool, reassembled in page order
+                text = ocr_pdf(
+                    self.file_path,
+                    lang='heb+eng',
+                    separator='',
+                    progress=lambda done, total: self.progress.emit(int(done / total * 100))
+                )
             else:
                 # Process single image
-                text = pytesseract.image_to_string(self.file_path, lang='heb+eng')
+                text = ocr_image_file(self.file_path, lang='heb+eng')
                 self.progress.emit(100)
             
             self.finished.emit(text)
@@ -0,0 +1,74 @@
+"""Optional upload of /api/ocr/pdf documents to GCS; OCR itself always runs on
+the local copy, so the result never needs the cloud copy.
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from gcs_clients import get_bucket
+
+logger = logging.getLogger(__name__)
+
+# off: no upload (default); async: upload in the background without holding up the
+# result; sync: upload inside the job before OCR, failing the job if it fails.
+ARCHIVE_MODES = ("off", "async", "sync")
+ARCHIVE_MODE = os.environ.get("OCR_ARCHIVE_MODE", "off").lower()
+if ARCHIVE_MODE not in ARCHIVE_MODES:
+    raise ValueError(f"OCR_ARCHIVE_MODE must be one of {', '.join(ARCHIVE_MODES)}, got {ARCHIVE_MODE!r}")
+# Keep uploaded blobs instead of deleting them when the job ends.
+ARCHIVE_KEEP = os.environ.get("OCR_ARCHIVE_KEEP", "").lower() in ("1", "true", "yes")
+# Archive uploads running at once per process.
+ARCHIVE_WORKERS = max(1, int(os.environ.get("OCR_ARCHIVE_WORKERS", "4")))
+# Async uploads running or queued at once; jobs beyond this archive inline.
+ARCHIVE_MAX_PENDING = max(1, int(os.environ.get("OCR_ARCHIVE_MAX_PENDING", "16")))
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS, thread_name_prefix="gcs-archive")
+        return _executor
+
+def upload(bucket_name, local_path, blob_name):
+    """Upload local_path to gs://bucket_name/blob_name and return the blob."""
+    blob = get_bucket(bucket_name).blob(blob_name)
+    blob.upload_from_filename(local_path)
+    return blob
+
+def archive(bucket_name, local_path, blob_name):
+    """Upload like upload(), but log failures instead of raising; return True on success."""
+    try:
+        upload(bucket_name, local_path, blob_name)
+        logger.info(f"Archived {blob_name} to gs://{bucket_name}")
+        return True
+    except Exception as e:
+        logger.error(f"Could not archive {blob_name} to gs://{bucket_name}: {e}")
+        return False
+
+def archive_in_background(bucket_name, local_path, blob_name):
+    """Start archiving local_path in the background; return a Future of archive()'s result.
+
+    Returns None when ARCHIVE_MAX_PENDING uploads are already pending; the caller
+    should then archive inline.
+    """
+    global _pending
+    with _executor_lock:
+        if _pending >= ARCHIVE_MAX_PENDING:
+            logger.warning(f"{_pending} archive uploads pending; archiving {blob_name} inline")
+            return None
+        _pending += 1
+
+    def run():
+        global _pending
+        try:
+            return archive(bucket_name, local_path, blob_name)
+        finally:
+            with _executor_lock:
+                _pending -= 1
+
+    return _get_executor().submit(run)
@@ -0,0 +1,140 @@
+"""Background, batched deletion of GCS objects the OCR jobs no longer need.
+
+schedule_delete() queues blobs or prefixes; a daemon thread deletes them in GCS
+batch requests and retries failures. Blobs it gives up on are listed by stats().
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+from google.cloud import storage
+from google.api_core.exceptions import NotFound
+
+logger = logging.getLogger(__name__)
+
+# GCS accepts at most 100 calls per batch request.
+CLEANUP_BATCH_SIZE = 100
+CLEANUP_FLUSH_SECONDS = float(os.environ.get("GCS_CLEANUP_FLUSH_SECONDS", "2"))
+CLEANUP_MAX_ATTEMPTS = 5
+CLEANUP_RETRY_SECONDS = 5
+
+_pending = queue.Queue()
+_client = None
+_worker = None
+_worker_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"deleted": 0, "retried": 0, "failed": 0}
+_failed_blobs = deque(maxlen=100)
+
+def schedule_delete(bucket_name, blob_names=(), prefix=None):
+    """Queue blobs (and/or every blob under `prefix`) for deletion in the background."""
+    _start_worker()
+    for blob_name in blob_names:
+        _pending.put((bucket_name, blob_name, None, 1))
+    if prefix is not None:
+        _pending.put((bucket_name, None, prefix, 1))
+
+def stats():
+    """Deletion counters, queue length and the most recent blobs that could not be deleted."""
+    with _stats_lock:
+        return dict(_stats, pending=_pending.qsize(), failed_blobs=list(_failed_blobs))
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+def _get_client():
+    # A client of its own: batch() routes every call made through the client
+    # into the batch, which must not capture other threads' requests.
+    global _client
+    if _client is None:
+        _client = storage.Client()
+    return _client
+
+def _start_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="gcs-cleanup", daemon=True)
+            _worker.start()
+
+def _run():
+    while True:
+        items = [_pending.get()]
+        deadline = time.monotonic() + CLEANUP_FLUSH_SECONDS
+        while len(items) < CLEANUP_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(_pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            process(items)
+        except Exception as e:
+            logger.error(f"GCS cleanup pass failed: {e}")
+
+def process(items):
+    """Delete a collected group of (bucket, blob_name, prefix, attempt) items."""
+    by_bucket = {}
+    for bucket_name, blob_name, prefix, attempt in items:
+        names = by_bucket.setdefault(bucket_name, {})
+        if prefix is None:
+            names[blob_name] = max(attempt, names.get(blob_name, 0))
+            continue
+        try:
+            for blob in _get_client().bucket(bucket_name).list_blobs(prefix=prefix):
+                names[blob.name] = max(attempt, names.get(blob.name, 0))
+        except Exception as e:
+            _retry_or_fail(bucket_name, None, prefix, attempt, e)
+
+    for bucket_name, names in by_bucket.items():
+        blob_names = list(names)
+        for start in range(0, len(blob_names), CLEANUP_BATCH_SIZE):
+            chunk = blob_names[start:start + CLEANUP_BATCH_SIZE]
+            for blob_name, error in _delete_batch(bucket_name, chunk).items():
+                _retry_or_fail(bucket_name, blob_name, None, names[blob_name], error)
+
+def _delete_batch(bucket_name, blob_names):
+    """Delete blob_names in one batch request; return {blob_name: error} for those that failed."""
+    client = _get_client()
+    bucket = client.bucket(bucket_name)
+    try:
+        with client.batch():
+            for blob_name in blob_names:
+                bucket.blob(blob_name).delete()
+        _count("deleted", len(blob_names))
+        return {}
+    except Exception as e:
+        # The batch reports only its first failure, so find out blob by blob.
+        logger.warning(f"Batch delete of {len(blob_names)} blobs failed ({e}); deleting one by one")
+    failures = {}
+    for blob_name in blob_names:
+        try:
+            bucket.blob(blob_name).delete()
+        except NotFound:
+            pass
+        except Exception as e:
+            failures[blob_name] = e
+            continue
+        _count("deleted")
+    return failures
+
+def _retry_or_fail(bucket_name, blob_name, prefix, attempt, error):
+    target = blob_name if prefix is None else f"{prefix}*"
+    if attempt < CLEANUP_MAX_ATTEMPTS:
+        _count("retried")
+        timer = threading.Timer(
+            CLEANUP_RETRY_SECONDS * attempt, _pending.put, args=((bucket_name, blob_name, prefix, attempt + 1),)
+        )
+        timer.daemon = True
+        timer.start()
+        return
+    _count("failed")
+    with _stats_lock:
+        _failed_blobs.append(f"gs://{bucket_name}/{target}")
+    logger.error(f"Could not delete gs://{bucket_name}/{target} after {attempt} attempts: {error}")
@@ -0,0 +1,59 @@
+"""Process-wide Google Cloud Storage and Vision clients, created on first use.
+
+The storage client's connection pool is sized for the server's threads (GCS_POOL_SIZE).
+"""
+import os
+import logging
+import threading
+
+import requests.adapters
+from google.cloud import storage
+
+logger = logging.getLogger(__name__)
+
+# Kept connections to storage.googleapis.com per process.
+GCS_POOL_SIZE = int(os.environ.get("GCS_POOL_SIZE", "32"))
+
+_lock = threading.Lock()
+_storage_client = None
+_vision_client = None
+_buckets = {}
+_verified_buckets = set()
+
+def get_storage_client():
+    """Return the shared storage.Client, creating it on first use."""
+    global _storage_client
+    with _lock:
+        if _storage_client is None:
+            client = storage.Client()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE)
+            client._http.mount("https://", adapter)
+            _storage_client = client
+        return _storage_client
+
+def get_vision_client():
+    """Return the shared Vision ImageAnnotatorClient, creating it on first use."""
+    global _vision_client
+    with _lock:
+        if _vision_client is None:
+            from google.cloud import vision_v1
+            _vision_client = vision_v1.ImageAnnotatorClient()
+        return _vision_client
+
+def get_bucket(bucket_name):
+    """Return a Bucket handle for `bucket_name` (no network call)."""
+    client = get_storage_client()
+    with _lock:
+        bucket = _buckets.get(bucket_name)
+        if bucket is None:
+            bucket = _buckets[bucket_name] = client.bucket(bucket_name)
+        return bucket
+
+def bucket_exists(bucket_name):
+    """True if the bucket exists and is accessible; a success is remembered for the process."""
+    if bucket_name in _verified_buckets:
+        return True
+    if not get_bucket(bucket_name).exists():
+        return False
+    _verified_buckets.add(bucket_name)
+    return True
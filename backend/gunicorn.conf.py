@@ -17,7 +17,10 @@ backlog = 2048
 
 # Worker processes
 workers = 1  # Single worker for development
-worker_class = 'sync'
+# Threaded workers: an open /api/ocr/pdf/stream response holds a thread, not the
+# whole worker, and the arbiter's heartbeat doesn't depend on request length.
+worker_class = 'gthread'
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -68,8 +71,11 @@ def worker_abort(worker):
 
 # Gunicorn config variables
 preload_app = True
-max_requests = 1000
-max_requests_jitter = 50
+# OCR jobs run on threads inside the worker (ocr_jobs), so recycling a worker
+# after N requests would kill the documents it is still processing. Status polls
+# and SSE reconnects count as requests too.
+max_requests = 0
+max_requests_jitter = 0
 graceful_timeout = 30
 
 # Resource management
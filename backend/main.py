@@ -1,49 +1,102 @@
-from flask import Flask, request, jsonify
-from google.cloud import storage
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
+from flask import Flask, Response, request, jsonify, stream_with_context
+import io
 import os
+import time
 import uuid
 import requests
 import json
+from ocr_pages import ocr_image_file, iter_pdf_text, OCR_LANG, RENDER_DPI
+from pdf_text_layer import USE_TEXT_LAYER, MIN_TEXT_LAYER_CHARS
+from pdf_page_images import EXTRACT_PAGE_IMAGES
+import ocr_cache
+import gcs_archive
+import gcs_cleanup
+import scratch
+from ocr_jobs import enqueue_job, get_job, get_pages, FAILED, DONE
 
 app = Flask(__name__)
 
 GCS_BUCKET_NAME = os.environ.get("GCS_BUCKET_NAME")
-UPLOAD_FOLDER = "/tmp"
-ocr_results = {}
-
-def upload_to_gcs(local_path, gcs_filename):
-    client = storage.Client()
-    bucket = client.bucket(GCS_BUCKET_NAME)
-    blob = bucket.blob(gcs_filename)
-    blob.upload_from_filename(local_path)
-    return blob
-
-def delete_from_gcs(gcs_filename):
-    client = storage.Client()
-    bucket = client.bucket(GCS_BUCKET_NAME)
-    blob = bucket.blob(gcs_filename)
-    blob.delete()
-
-def file_exists_in_gcs(gcs_filename):
-    client = storage.Client()
-    bucket = client.bucket(GCS_BUCKET_NAME)
-    blob = bucket.blob(gcs_filename)
-    return blob.exists()
-
-def real_ocr(local_path):
-    text = ""
+STREAM_POLL_SECONDS = 0.25
+STREAM_KEEPALIVE_SECONDS = 15
+# Streams end before gunicorn's 30 s worker timeout; EventSource reconnects with
+# Last-Event-ID and picks up after the last page it received.
+STREAM_MAX_SECONDS = int(os.environ.get("OCR_STREAM_MAX_SECONDS", "25"))
+STREAM_RETRY_MS = 1000
+
+def real_ocr(local_path, progress=None):
+    """Return (text, pages) where pages records how each page's text was obtained.
+
+    `progress`, if given, is called as progress(pages_done, pages_total, page) after
+    each page, with that page's full result (text, confidence, timing, source).
+    Results are cached by file content and OCR settings; a cache hit replays the
+    stored pages without running any OCR.
+    """
+    key = ocr_cache.cache_key(
+        local_path, "tesseract", lang=OCR_LANG, dpi=RENDER_DPI, text_layer=USE_TEXT_LAYER,
+        min_text_layer_chars=MIN_TEXT_LAYER_CHARS, extract_page_images=EXTRACT_PAGE_IMAGES
+    )
+    cached = ocr_cache.get(key)
+    if cached is not None:
+        for page in cached["pages"]:
+            if progress:
+                progress(page["page"], page["page_count"], page)
+        return cached["text"], [{"page": p["page"], "source": p["source"], "cached": True} for p in cached["pages"]]
+
+    text, pages = _run_tesseract_ocr(local_path, progress)
+    ocr_cache.put(key, "tesseract", {"text": text, "pages": pages})
+    return text, [{"page": p["page"], "source": p["source"]} for p in pages]
+
+def _run_tesseract_ocr(local_path, progress):
     ext = os.path.splitext(local_path)[1].lower()
-    if ext == ".pdf":
-        images = convert_from_path(local_path)
-        for img in images:
-            text += pytesseract.image_to_string(img, lang="eng+heb") + "\n"
-    else:
-        img = Image.open(local_path)
-        text = pytesseract.image_to_string(img, lang="eng+heb")
-    return text.strip()
+    if ext != ".pdf":
+        started = time.perf_counter()
+        text = ocr_image_file(local_path).strip()
+        page = {
+            "page": 1, "page_count": 1, "text": text, "source": "image",
+            "confidence": None, "elapsed": round(time.perf_counter() - started, 3)
+        }
+        if progress:
+            progress(1, 1, page)
+        return text, [page]
+    text = io.StringIO()
+    pages = []
+    for page in iter_pdf_text(local_path):
+        text.write(page["text"])
+        text.write("\n")
+        pages.append(page)
+        if progress:
+            progress(page["page"], page["page_count"], page)
+    return text.getvalue().strip(), pages
+
+def run_ocr_job(progress, local_path, filename, archive=None):
+    """Background body of an /api/ocr/pdf job.
+
+    `archive` is the Future of a background archive upload still reading
+    local_path. Without one the upload (if any) happens here, before OCR.
+    """
+    uploaded = False
+    try:
+        if archive is None and gcs_archive.ARCHIVE_MODE == "sync":
+            gcs_archive.upload(GCS_BUCKET_NAME, local_path, filename)
+            uploaded = True
+        elif archive is None and gcs_archive.ARCHIVE_MODE == "async":
+            uploaded = gcs_archive.archive(GCS_BUCKET_NAME, local_path, filename)
+        ocr_text, pages = real_ocr(local_path, progress=progress)
+        return {"text": ocr_text, "pages": pages}
+    finally:
+        _release_upload(os.path.dirname(local_path), filename, archive, uploaded)
+
+def _release_upload(work_dir, filename, archive=None, uploaded=False):
+    """Remove the job's workspace and queue its archived blob for deletion, once `archive` is done."""
+    if archive is not None:
+        # Runs right away if the upload has already finished
+        archive.add_done_callback(lambda f: _release_upload(work_dir, filename, uploaded=f.result()))
+        return
+    scratch.remove_workspace(work_dir)
+    if uploaded and not gcs_archive.ARCHIVE_KEEP:
+        # Deleted in the background; blobs that can't be removed show up in /api/cleanup/stats
+        gcs_cleanup.schedule_delete(GCS_BUCKET_NAME, [filename])
 
 @app.route("/api/ocr/pdf", methods=["POST"])
 def ocr_pdf():
@@ -52,27 +105,89 @@ def ocr_pdf():
     file = request.files["file"]
     job_id = str(uuid.uuid4())
     filename = f"{job_id}_{file.filename}"
-    local_path = os.path.join(UPLOAD_FOLDER, filename)
+    work_dir = scratch.create_workspace(job_id)
+    local_path = os.path.join(work_dir, filename)
     file.save(local_path)
 
+    archive = None
+    if gcs_archive.ARCHIVE_MODE == "async":
+        archive = gcs_archive.archive_in_background(GCS_BUCKET_NAME, local_path, filename)
     try:
-        upload_to_gcs(local_path, filename)
-        ocr_text = real_ocr(local_path)
-        ocr_results[job_id] = ocr_text
-        delete_from_gcs(filename)
-        if file_exists_in_gcs(filename):
-            warning = f"WARNING: File {filename} was NOT deleted from bucket {GCS_BUCKET_NAME}!"
-        else:
-            warning = ""
-        os.remove(local_path)
-        return jsonify({"success": True, "job_id": job_id, "warning": warning})
+        enqueue_job(job_id, run_ocr_job, local_path, filename, archive)
+        return jsonify({"success": True, "job_id": job_id, "status": "queued"})
     except Exception as e:
+        _release_upload(work_dir, filename, archive)
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route("/api/ocr/pdf/status/<job_id>", methods=["GET"])
 def ocr_pdf_status(job_id):
-    text = ocr_results.get(job_id, "")
-    return jsonify({"job_id": job_id, "status": "done", "success": True, "text": text})
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"job_id": job_id, "success": False, "error": "Unknown job"}), 404
+    response = {
+        "job_id": job_id,
+        "status": job["status"],
+        "success": job["status"] != FAILED,
+        "pages_done": job["pages_done"],
+        "pages_total": job["pages_total"],
+    }
+    if job["status"] == DONE:
+        response.update(text=job["text"], pages=job["pages"])
+    elif job["status"] == FAILED:
+        response["error"] = job["error"]
+    return jsonify(response)
+
+@app.route("/api/ocr/pdf/stream/<job_id>", methods=["GET"])
+def ocr_pdf_stream(job_id):
+    """Server-Sent Events stream of a job's pages as they finish.
+
+    Emits one "page" event per page (page, page_count, text, confidence, elapsed,
+    source) with the page number as its id, then a final "done" or "failed" event
+    carrying the job status. A stream still open after STREAM_MAX_SECONDS is closed;
+    the reconnecting client's Last-Event-ID resumes it after that page.
+    """
+    if get_job(job_id) is None:
+        return jsonify({"job_id": job_id, "success": False, "error": "Unknown job"}), 404
+    try:
+        resume_after = int(request.headers.get("Last-Event-ID", "0"))
+    except ValueError:
+        resume_after = 0
+
+    def sse(event, data, event_id=None):
+        id_line = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{id_line}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    def events():
+        last_page = resume_after
+        started = last_sent = time.monotonic()
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        while True:
+            # Read the status before the pages so no page written before completion is missed
+            job = get_job(job_id)
+            for page in get_pages(job_id, after=last_page):
+                last_page = page["page"]
+                last_sent = time.monotonic()
+                yield sse("page", page, event_id=last_page)
+            if job is None or job["status"] in (DONE, FAILED):
+                break
+            if time.monotonic() - started >= STREAM_MAX_SECONDS:
+                return
+            if time.monotonic() - last_sent >= STREAM_KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+            time.sleep(STREAM_POLL_SECONDS)
+        if job is None:
+            yield sse("failed", {"job_id": job_id, "status": FAILED, "error": "Job expired"})
+        elif job["status"] == DONE:
+            yield sse("done", {"job_id": job_id, "status": DONE, "pages_total": job["pages_total"]})
+        else:
+            yield sse("failed", {"job_id": job_id, "status": FAILED, "error": job["error"]})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.route("/api/summarize", methods=["POST"])
 def summarize():
@@ -120,6 +235,14 @@ def summarize():
     else:
         return jsonify({"success": False, "error": "Unknown engine."})
 
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify({"success": True, **ocr_cache.stats()})
+
+@app.route("/api/cleanup/stats", methods=["GET"])
+def cleanup_stats():
+    return jsonify({"success": True, **gcs_cleanup.stats()})
+
 @app.route("/health", methods=["GET"])
 def health():
     return jsonify({"status": "ok"})
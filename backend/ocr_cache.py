@@ -0,0 +1,139 @@
+"""Content-addressed OCR result cache, shared by all engines.
+
+Keys hash the file's bytes plus the engine and every setting that changes its
+output. Entries live in an SQLite file with LRU eviction under a byte budget.
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_ENABLED = os.environ.get("OCR_CACHE_ENABLED", "1") != "0"
+OCR_CACHE_DB = os.environ.get(
+    "OCR_CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_cache.db")
+)
+OCR_CACHE_MAX_BYTES = int(os.environ.get("OCR_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+_local = threading.local()
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            engine TEXT NOT NULL,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+    conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    return conn
+
+def _connection(db_path=None):
+    db_path = db_path or OCR_CACHE_DB
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = connections[db_path] = _connect(db_path)
+    return conn
+
+def _count(conn, name, amount=1):
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, amount)
+    )
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_key(path, engine, **settings):
+    """Key for `path` as processed by `engine` with the given output-affecting settings."""
+    material = json.dumps(
+        {"file": file_digest(path), "engine": engine, "settings": settings}, sort_keys=True
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def get(key, db_path=None):
+    """Return the cached result dict for `key`, or None. Counts a hit or a miss."""
+    if not OCR_CACHE_ENABLED:
+        return None
+    try:
+        conn = _connection(db_path)
+        row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _count(conn, "misses")
+            return None
+        conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        _count(conn, "hits")
+        return json.loads(zlib.decompress(row["value"]))
+    except (sqlite3.Error, zlib.error, ValueError) as e:
+        logger.error(f"OCR cache lookup failed: {e}")
+        return None
+
+def put(key, engine, value, db_path=None):
+    """Store a result dict under `key`, evicting least recently used entries if needed."""
+    if not OCR_CACHE_ENABLED:
+        return
+    data = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), 6)
+    if len(data) > OCR_CACHE_MAX_BYTES:
+        return
+    now = time.time()
+    try:
+        conn = _connection(db_path)
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, engine, value, size, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, engine, data, len(data), now, now)
+        )
+        _evict(conn)
+    except sqlite3.Error as e:
+        logger.error(f"OCR cache store failed: {e}")
+
+def _evict(conn):
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= OCR_CACHE_MAX_BYTES:
+        return
+    doomed = []
+    for row in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+        if total <= OCR_CACHE_MAX_BYTES:
+            break
+        doomed.append((row["key"],))
+        total -= row["size"]
+    conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+    _count(conn, "evictions", len(doomed))
+    logger.info(f"Evicted {len(doomed)} OCR cache entries")
+
+def stats(db_path=None):
+    """Hit/miss/eviction counters and current size of the cache."""
+    conn = _connection(db_path)
+    counters = {row["name"]: row["value"] for row in conn.execute("SELECT name, value FROM counters")}
+    entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    return {
+        "enabled": OCR_CACHE_ENABLED,
+        "hits": counters.get("hits", 0),
+        "misses": counters.get("misses", 0),
+        "evictions": counters.get("evictions", 0),
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": OCR_CACHE_MAX_BYTES,
+    }
@@ -0,0 +1,99 @@
+"""Background execution and status tracking for OCR jobs.
+
+Request handlers enqueue work and return immediately; a small thread pool runs
+the jobs (page OCR itself still fans out to the process pool in ocr_pages).
+Job state lives in result_store so every server process can report on it. A
+heartbeat thread marks this process's jobs as alive so that jobs orphaned by a
+recycled or crashed worker are reported as failed.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import result_store
+
+logger = logging.getLogger(__name__)
+
+# Documents processed concurrently per server process.
+JOB_WORKERS = max(1, int(os.environ.get("OCR_JOB_WORKERS", "2")))
+# Well under result_store.JOB_STALE_SECONDS.
+HEARTBEAT_SECONDS = 30
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_executor = None
+_executor_lock = threading.Lock()
+_active_jobs = set()
+_heartbeat = None
+
+def _get_executor():
+    global _executor, _heartbeat
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="ocr-job")
+            _heartbeat = threading.Thread(target=_beat_forever, name="ocr-job-heartbeat", daemon=True)
+            _heartbeat.start()
+        return _executor
+
+def _beat_forever():
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        with _executor_lock:
+            job_ids = list(_active_jobs)
+        try:
+            result_store.heartbeat(job_ids)
+        except Exception as e:
+            logger.error(f"Error recording OCR job heartbeat: {e}")
+
+def get_job(job_id):
+    """Return the job's state and result fields, or None for an unknown job."""
+    return result_store.get_job(job_id)
+
+def get_pages(job_id, after=0):
+    """Return the job's finished pages numbered above `after`."""
+    return result_store.get_pages(job_id, after=after)
+
+def enqueue_job(job_id, fn, *args):
+    """Queue fn(progress, *args) to run in the background under `job_id`.
+
+    fn reports progress by calling progress(pages_done, pages_total, page=None),
+    passing each finished page's result dict so it can be streamed to clients, and
+    returns a dict of result fields (e.g. text, pages) stored with the job on success.
+    """
+    result_store.create_job(job_id, QUEUED)
+    executor = _get_executor()
+    with _executor_lock:
+        _active_jobs.add(job_id)
+    try:
+        executor.submit(_run_job, job_id, fn, args)
+    except Exception:
+        with _executor_lock:
+            _active_jobs.discard(job_id)
+        raise
+
+def _run_job(job_id, fn, args):
+    try:
+        _execute(job_id, fn, args)
+    finally:
+        with _executor_lock:
+            _active_jobs.discard(job_id)
+
+def _execute(job_id, fn, args):
+    result_store.update_job(job_id, status=RUNNING, started_at=time.time())
+
+    def progress(pages_done, pages_total, page=None):
+        if page is not None:
+            result_store.save_page(job_id, page)
+        result_store.update_job(job_id, pages_done=pages_done, pages_total=pages_total)
+
+    try:
+        result = fn(progress, *args) or {}
+        result_store.save_result(job_id, result, status=DONE, finished_at=time.time())
+    except Exception as e:
+        logger.exception(f"OCR job {job_id} failed")
+        result_store.update_job(job_id, status=FAILED, finished_at=time.time(), error=str(e))
@@ -0,0 +1,259 @@
+"""Page-level OCR helpers shared by the Flask backend and the desktop worker."""
+import io
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+from pdf_page_images import extract_page_image, full_page_image_pages
+from pdf_text_layer import text_layer_pages
+
+try:
+    # Tesseract C API bindings: the engine and traineddata stay loaded between pages.
+    from tesserocr import PyTessBaseAPI
+except ImportError:
+    PyTessBaseAPI = None
+
+logger = logging.getLogger(__name__)
+
+if PyTessBaseAPI is None:
+    logger.warning("tesserocr is not installed; every page will start a separate tesseract process")
+
+OCR_LANG = "eng+heb"
+RENDER_DPI = int(os.environ.get("OCR_RENDER_DPI", "200"))
+# Number of pages rendered per pdftoppm call. Only one window is ever held in memory.
+PAGE_WINDOW = max(1, int(os.environ.get("OCR_PAGE_WINDOW", "1")))
+# Worker processes for multi-page documents; 1 keeps everything in the calling process.
+OCR_WORKERS = max(1, int(os.environ.get("OCR_WORKERS", str(os.cpu_count() or 1))))
+
+TESSDATA_PREFIX = os.environ.get("TESSDATA_PREFIX")
+
+_executor = None
+_executor_lock = threading.Lock()
+# The pool is started from a job thread of a multi-threaded server. Forking there
+# could copy locks (sqlite, logging, _engines_lock) held by other threads into the
+# children, so workers come from a clean forkserver process instead.
+POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# Idle resident engines by language. PyTessBaseAPI is not thread-safe, so each
+# engine is used by one thread at a time.
+_idle_engines = {}
+_engines_lock = threading.Lock()
+
+def count_pdf_pages(pdf_path):
+    """Return the number of pages in a PDF."""
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+def iter_pdf_pages(pdf_path, pages=None, window=PAGE_WINDOW, dpi=RENDER_DPI):
+    """Yield (page_number, image) pairs, rendering up to `window` consecutive pages at a time.
+
+    `pages` restricts rendering to the given page numbers (default: every page).
+    Each image is closed as soon as the caller moves on to the next page, so peak
+    memory is bounded by the window size rather than the document length.
+    """
+    if pages is None:
+        pages = range(1, count_pdf_pages(pdf_path) + 1)
+    pages = sorted(pages)
+    start = 0
+    while start < len(pages):
+        end = start + 1
+        while end < len(pages) and end - start < window and pages[end] == pages[end - 1] + 1:
+            end += 1
+        first, last = pages[start], pages[end - 1]
+        images = convert_from_path(pdf_path, dpi=dpi, first_page=first, last_page=last)
+        try:
+            for offset, image in enumerate(images):
+                yield first + offset, image
+                image.close()
+        finally:
+            for image in images:
+                image.close()
+            del images[:]
+        start = end
+
+def _create_tesseract_engine(lang):
+    logger.info(f"Loading resident Tesseract engine for {lang} in process {os.getpid()}")
+    if TESSDATA_PREFIX:
+        return PyTessBaseAPI(path=TESSDATA_PREFIX, lang=lang)
+    return PyTessBaseAPI(lang=lang)
+
+@contextmanager
+def tesseract_engine(lang=OCR_LANG):
+    """Check out an idle resident Tesseract engine for `lang`, or None without tesserocr.
+
+    Engines are kept per process and reused across calls and threads; a new one is
+    only loaded when every existing engine for that language is busy.
+    """
+    if PyTessBaseAPI is None:
+        yield None
+        return
+    with _engines_lock:
+        idle = _idle_engines.setdefault(lang, [])
+        engine = idle.pop() if idle else None
+    if engine is None:
+        engine = _create_tesseract_engine(lang)
+    try:
+        yield engine
+    finally:
+        engine.Clear()
+        with _engines_lock:
+            _idle_engines[lang].append(engine)
+
+def recognize_image(image, lang=OCR_LANG):
+    """OCR a single PIL image or image path and return (text, confidence).
+
+    Uses a resident engine when tesserocr is installed, which also reports the
+    mean word confidence (0-100). The pytesseract fallback spawns the tesseract
+    binary and has no confidence without a second run, so it returns None.
+    """
+    with tesseract_engine(lang) as engine:
+        if engine is None:
+            return pytesseract.image_to_string(image, lang=lang), None
+        if isinstance(image, str):
+            with Image.open(image) as opened:
+                engine.SetImage(opened)
+                return engine.GetUTF8Text(), engine.MeanTextConf()
+        engine.SetImage(image)
+        return engine.GetUTF8Text(), engine.MeanTextConf()
+
+def ocr_image(image, lang=OCR_LANG):
+    """OCR a single PIL image or image path."""
+    return recognize_image(image, lang=lang)[0]
+
+def _page_result(image, lang, source, started):
+    text, confidence = recognize_image(image, lang=lang)
+    return {
+        "text": text,
+        "source": source,
+        "confidence": confidence,
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+def _init_pool_worker(lang=OCR_LANG):
+    """Keep Tesseract single-threaded and load the language models once per worker."""
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    with tesseract_engine(lang):
+        pass
+
+def _ocr_pdf_page(pdf_path, page_number, lang, dpi, embedded_image=False):
+    """OCR a single page and return its result dict. Runs inside a pool worker.
+
+    Pages known to be a single full-page scan use the embedded image directly;
+    everything else, and any failed extraction, is rendered with pdftoppm.
+    """
+    started = time.perf_counter()
+    if embedded_image:
+        image = extract_page_image(pdf_path, page_number)
+        if image is not None:
+            try:
+                return _page_result(image, lang, "embedded_image", started)
+            finally:
+                image.close()
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    try:
+        return _page_result(images[0], lang, "rendered", started)
+    finally:
+        for image in images:
+            image.close()
+
+def get_ocr_executor(workers=OCR_WORKERS, lang=OCR_LANG):
+    """Return the shared page OCR process pool, sized by the first caller.
+
+    Each worker preloads an engine for the first caller's `lang`; engines are
+    kept per exact language string, so preloading any other would be wasted.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            logger.info(f"Starting OCR process pool with {workers} workers for {lang}")
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_pool_worker, initargs=(lang,),
+                mp_context=multiprocessing.get_context(POOL_START_METHOD)
+            )
+        return _executor
+
+def _reset_ocr_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def ocr_image_file(image_path, lang=OCR_LANG, workers=None):
+    """OCR a single image file on a pool worker whose engine is already loaded."""
+    workers = OCR_WORKERS if workers is None else workers
+    if workers <= 1:
+        return ocr_image(image_path, lang=lang)
+    try:
+        return get_ocr_executor(workers, lang).submit(ocr_image, image_path, lang).result()
+    except BrokenProcessPool:
+        _reset_ocr_executor()
+        raise
+
+def _iter_ocr_texts(pdf_path, pages, image_pages, lang, workers, dpi):
+    """Yield the result dict of each page in `pages`, in order."""
+    if workers <= 1 or len(pages) <= 1:
+        rendered = iter_pdf_pages(pdf_path, pages=[n for n in pages if n not in image_pages], dpi=dpi)
+        for page_number in pages:
+            if page_number in image_pages:
+                yield _ocr_pdf_page(pdf_path, page_number, lang, dpi, embedded_image=True)
+                continue
+            started = time.perf_counter()
+            _, image = next(rendered)
+            yield _page_result(image, lang, "rendered", started)
+        return
+    count = len(pages)
+    try:
+        yield from get_ocr_executor(workers, lang).map(
+            _ocr_pdf_page, [pdf_path] * count, pages, [lang] * count, [dpi] * count,
+            [n in image_pages for n in pages]
+        )
+    except BrokenProcessPool:
+        _reset_ocr_executor()
+        raise
+
+def iter_pdf_text(pdf_path, lang=OCR_LANG, workers=None, dpi=RENDER_DPI):
+    """Yield a result dict for every page, in page order.
+
+    Each dict has page, page_count, text, confidence (Tesseract mean word
+    confidence, or None when unknown), elapsed (seconds spent on the page) and
+    the path its text came from in "source":
+      text_layer      the PDF's own text layer, no OCR needed
+      embedded_image  OCR of the page's native scan image, pulled out without rendering
+      rendered        OCR of the page rasterized at `dpi`
+    With more than one worker the OCR pages are spread over the shared process pool,
+    otherwise they are streamed through the calling process one window at a time.
+    """
+    workers = OCR_WORKERS if workers is None else workers
+    total = count_pdf_pages(pdf_path)
+    embedded = text_layer_pages(pdf_path)
+    ocr_pages = [n for n in range(1, total + 1) if n not in embedded]
+    if embedded:
+        logger.info(f"{pdf_path}: {len(embedded)} of {total} pages have a text layer, OCRing {len(ocr_pages)}")
+    image_pages = full_page_image_pages(pdf_path, total) if ocr_pages else set()
+    ocr_texts = _iter_ocr_texts(pdf_path, ocr_pages, image_pages, lang, workers, dpi)
+    for page_number in range(1, total + 1):
+        if page_number in embedded:
+            page = {"text": embedded[page_number], "source": "text_layer", "confidence": None, "elapsed": 0.0}
+        else:
+            page = next(ocr_texts)
+        yield {"page": page_number, "page_count": total, **page}
+
+def ocr_pdf(pdf_path, lang=OCR_LANG, workers=None, separator="\n", progress=None):
+    """OCR a PDF and return the page texts joined in page order.
+
+    `progress`, if given, is called as progress(pages_done, page_count) after each page.
+    """
+    text = io.StringIO()
+    for page in iter_pdf_text(pdf_path, lang=lang, workers=workers):
+        text.write(page["text"])
+        text.write(separator)
+        if progress:
+            progress(page["page"], page["page_count"])
+    return text.getvalue()
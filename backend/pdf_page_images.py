@@ -0,0 +1,115 @@
+"""Pull the native scan image out of image-only PDF pages instead of re-rendering them.
+
+Scanned PDFs usually wrap exactly one JPEG/CCITT/Flate image per page. When a page
+is just that image, extracting it with poppler's pdfimages gives the scanner's own
+pixels at their own resolution, with no rasterization or resampling.
+"""
+import os
+import re
+import glob
+import logging
+import subprocess
+import tempfile
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_PAGE_IMAGES = os.environ.get("OCR_EXTRACT_PAGE_IMAGES", "1") != "0"
+# How much of the page (in each dimension) the image must cover to count as full-page.
+MIN_PAGE_COVERAGE = 0.9
+# Lower resolutions are better served by rendering at RENDER_DPI.
+MIN_IMAGE_DPI = 150
+
+_PAGE_SIZE_RE = re.compile(r"^Page\s+(\d+)\s+size:\s+([\d.]+)\s+x\s+([\d.]+)")
+_PAGE_ROT_RE = re.compile(r"^Page\s+(\d+)\s+rot:\s+(\d+)")
+
+def _run(args, timeout=60):
+    result = subprocess.run(args, capture_output=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"{args[0]} failed: {result.stderr.decode(errors='replace')}")
+    return result.stdout.decode("utf-8", errors="replace")
+
+def page_geometry(pdf_path, page_count):
+    """Map page number to (width_pts, height_pts, rotation) using pdfinfo."""
+    output = _run(["pdfinfo", "-f", "1", "-l", str(page_count), pdf_path])
+    geometry = {}
+    for line in output.splitlines():
+        size = _PAGE_SIZE_RE.match(line)
+        if size:
+            page = int(size.group(1))
+            geometry[page] = (float(size.group(2)), float(size.group(3)), 0)
+            continue
+        rot = _PAGE_ROT_RE.match(line)
+        if rot and int(rot.group(1)) in geometry:
+            width, height, _ = geometry[int(rot.group(1))]
+            geometry[int(rot.group(1))] = (width, height, int(rot.group(2)))
+    return geometry
+
+def list_page_images(pdf_path):
+    """Map page number to the images pdfimages -list reports for it."""
+    images = {}
+    for line in _run(["pdfimages", "-list", pdf_path]).splitlines()[2:]:
+        # page num type width height color comp bpc enc interp object ID x-ppi y-ppi size ratio
+        parts = line.split()
+        if len(parts) < 14:
+            continue
+        images.setdefault(int(parts[0]), []).append({
+            "type": parts[2],
+            "width": int(parts[3]),
+            "height": int(parts[4]),
+            "encoding": parts[8],
+            "x_ppi": float(parts[12]),
+            "y_ppi": float(parts[13]),
+        })
+    return images
+
+def full_page_image_pages(pdf_path, page_count):
+    """Return the set of pages that consist of a single image covering the whole page."""
+    if not EXTRACT_PAGE_IMAGES:
+        return set()
+    try:
+        geometry = page_geometry(pdf_path, page_count)
+        images = list_page_images(pdf_path)
+    except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Could not inspect page images of {pdf_path}: {e}")
+        return set()
+
+    pages = set()
+    for page_number, page_images in images.items():
+        if len(page_images) != 1 or page_number not in geometry:
+            continue
+        image = page_images[0]
+        width_pts, height_pts, rotation = geometry[page_number]
+        if image["type"] != "image" or rotation != 0 or min(image["x_ppi"], image["y_ppi"]) < MIN_IMAGE_DPI:
+            continue
+        image_width_pts = image["width"] / image["x_ppi"] * 72
+        image_height_pts = image["height"] / image["y_ppi"] * 72
+        if (image_width_pts >= width_pts * MIN_PAGE_COVERAGE
+                and image_height_pts >= height_pts * MIN_PAGE_COVERAGE):
+            pages.add(page_number)
+    return pages
+
+def extract_page_image(pdf_path, page_number):
+    """Return the page's embedded image as a loaded PIL image, or None if extraction fails.
+
+    JPEGs are copied out byte-for-byte (-j); other encodings are decoded by pdfimages
+    to PBM/PPM at their native resolution.
+    """
+    with tempfile.TemporaryDirectory(prefix="ocr_page_") as tmp_dir:
+        prefix = os.path.join(tmp_dir, "page")
+        try:
+            _run(["pdfimages", "-f", str(page_number), "-l", str(page_number), "-j", pdf_path, prefix])
+        except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"pdfimages failed for page {page_number} of {pdf_path}: {e}")
+            return None
+        files = glob.glob(prefix + "-*")
+        if len(files) != 1:
+            return None
+        try:
+            image = Image.open(files[0])
+            image.load()
+        except OSError as e:
+            logger.warning(f"Could not decode embedded image of page {page_number} of {pdf_path}: {e}")
+            return None
+        return image
@@ -0,0 +1,56 @@
+"""Detect and extract embedded text layers from born-digital PDFs with pdftotext."""
+import os
+import logging
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+USE_TEXT_LAYER = os.environ.get("OCR_USE_TEXT_LAYER", "1") != "0"
+# A page needs at least this many letters/digits before its text layer is trusted.
+MIN_TEXT_LAYER_CHARS = int(os.environ.get("OCR_MIN_TEXT_LAYER_CHARS", "50"))
+# Share of characters that may be unmappable glyphs (broken font encodings).
+MAX_GARBAGE_RATIO = 0.1
+
+def extract_text_layer(pdf_path, timeout=120):
+    """Return the embedded text of each page, or [] if pdftotext is unavailable or fails."""
+    try:
+        result = subprocess.run(
+            ["pdftotext", "-enc", "UTF-8", pdf_path, "-"],
+            capture_output=True, timeout=timeout
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"pdftotext failed for {pdf_path}: {e}")
+        return []
+    if result.returncode != 0:
+        logger.warning(f"pdftotext failed for {pdf_path}: {result.stderr.decode(errors='replace')}")
+        return []
+    # pdftotext terminates every page with a form feed.
+    pages = result.stdout.decode("utf-8", errors="replace").split("\f")
+    return pages[:-1] if pages and pages[-1] == "" else pages
+
+def has_usable_text_layer(text):
+    """True if a page's embedded text looks like real content rather than noise."""
+    meaningful = sum(1 for c in text if c.isalnum())
+    if not meaningful or meaningful < MIN_TEXT_LAYER_CHARS:
+        return False
+    garbage = sum(1 for c in text if c == "�" or (not c.isprintable() and not c.isspace()))
+    return garbage / len(text) <= MAX_GARBAGE_RATIO
+
+def text_layer_pages(pdf_path):
+    """Map page number (1-based) to embedded text for every page whose layer is usable."""
+    if not USE_TEXT_LAYER:
+        return {}
+    return {
+        page_number: text
+        for page_number, text in enumerate(extract_text_layer(pdf_path), start=1)
+        if has_usable_text_layer(text)
+    }
+
+def born_digital_text(pdf_path):
+    """Return the whole document's text if every page has a usable text layer, else None."""
+    if not USE_TEXT_LAYER:
+        return None
+    pages = extract_text_layer(pdf_path)
+    if not pages or not all(has_usable_text_layer(text) for text in pages):
+        return None
+    return "\n".join(text.strip() for text in pages)
@@ -0,0 +1,249 @@
+"""SQLite-backed store for OCR job status and results.
+
+All server processes share one database file in WAL mode, so a job started by
+one gunicorn worker can be polled through any other and survives restarts.
+Finished results are evicted by age (TTL) and by total stored size, and large
+results are kept zlib-compressed. Each queued or running job records the process
+that owns it and that process's last heartbeat; a job whose owner has exited or
+stopped beating is marked failed when it is read or when eviction runs.
+"""
+import os
+import json
+import time
+import zlib
+import socket
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_DB_PATH = os.environ.get("OCR_RESULT_DB", os.path.join(BACKEND_DIR, "ocr_results.db"))
+RESULT_TTL_SECONDS = int(os.environ.get("OCR_RESULT_TTL_SECONDS", str(24 * 3600)))
+RESULT_MAX_BYTES = int(os.environ.get("OCR_RESULT_MAX_BYTES", str(512 * 1024 * 1024)))
+# Results smaller than this are stored as plain JSON.
+COMPRESS_MIN_BYTES = 4096
+# Eviction scans the table, so run it at most this often per process.
+EVICT_INTERVAL_SECONDS = 60
+# Queued/running jobs whose owner hasn't sent a heartbeat for this long are failed.
+JOB_STALE_SECONDS = int(os.environ.get("OCR_JOB_STALE_SECONDS", "120"))
+ACTIVE_STATUSES = ("queued", "running")
+LOST_JOB_ERROR = "Job was lost: the server process running it exited"
+
+STATUS_FIELDS = ("status", "pages_done", "pages_total", "error", "started_at", "finished_at")
+
+_local = threading.local()
+_last_evict = 0.0
+_evict_lock = threading.Lock()
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            pages_done INTEGER NOT NULL DEFAULT 0,
+            pages_total INTEGER,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            result BLOB,
+            result_size INTEGER NOT NULL DEFAULT 0,
+            compressed INTEGER NOT NULL DEFAULT 0,
+            owner TEXT,
+            heartbeat REAL
+        )
+    """)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            job_id TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            PRIMARY KEY (job_id, page)
+        )
+    """)
+    return conn
+
+def get_connection(db_path=None):
+    """Return this thread's connection to the result database."""
+    db_path = db_path or RESULT_DB_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = connections[db_path] = _connect(db_path)
+    return conn
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _owner_alive(owner):
+    """False only if `owner` is a process on this host that no longer exists."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def create_job(job_id, status, db_path=None):
+    """Create a job owned by the calling process."""
+    now = time.time()
+    get_connection(db_path).execute(
+        "INSERT OR REPLACE INTO jobs (job_id, status, created_at, updated_at, owner, heartbeat)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        (job_id, status, now, now, _owner(), now)
+    )
+
+def heartbeat(job_ids, db_path=None):
+    """Record that the calling process is still working on `job_ids`."""
+    get_connection(db_path).executemany(
+        "UPDATE jobs SET heartbeat = ? WHERE job_id = ?", [(time.time(), job_id) for job_id in job_ids]
+    )
+
+def _is_lost(row, now):
+    return (row["status"] in ACTIVE_STATUSES
+            and (max(row["heartbeat"] or 0, row["updated_at"]) < now - JOB_STALE_SECONDS
+                 or not _owner_alive(row["owner"])))
+
+def _mark_lost(conn, job_ids, now):
+    conn.executemany(
+        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, updated_at = ?"
+        " WHERE job_id = ? AND status IN ('queued', 'running')",
+        [(LOST_JOB_ERROR, now, now, job_id) for job_id in job_ids]
+    )
+    if job_ids:
+        logger.warning(f"Marked {len(job_ids)} lost OCR jobs as failed")
+
+def fail_lost_jobs(db_path=None, now=None):
+    """Mark queued/running jobs whose owner exited or went silent as failed; return how many."""
+    conn = get_connection(db_path)
+    now = time.time() if now is None else now
+    rows = conn.execute(
+        "SELECT job_id, status, updated_at, owner, heartbeat FROM jobs WHERE status IN ('queued', 'running')"
+    ).fetchall()
+    lost = [row["job_id"] for row in rows if _is_lost(row, now)]
+    _mark_lost(conn, lost, now)
+    return len(lost)
+
+def update_job(job_id, db_path=None, **fields):
+    """Update status columns of a job (see STATUS_FIELDS)."""
+    unknown = set(fields) - set(STATUS_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    get_connection(db_path).execute(
+        f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ?",
+        (*fields.values(), time.time(), job_id)
+    )
+
+def save_result(job_id, result, db_path=None, **fields):
+    """Store a job's result dict, compressing it when large, and update its status."""
+    data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+    compressed = len(data) >= COMPRESS_MIN_BYTES
+    if compressed:
+        data = zlib.compress(data, 6)
+    update_job(job_id, db_path=db_path, **fields)
+    get_connection(db_path).execute(
+        "UPDATE jobs SET result = ?, result_size = ?, compressed = ? WHERE job_id = ?",
+        (data, len(data), int(compressed), job_id)
+    )
+    maybe_evict(db_path)
+
+def save_page(job_id, page, db_path=None):
+    """Record one finished page (a dict with at least "page") as soon as it is ready."""
+    data = json.dumps(page, ensure_ascii=False)
+    get_connection(db_path).execute(
+        "INSERT OR REPLACE INTO pages (job_id, page, data, size) VALUES (?, ?, ?, ?)",
+        (job_id, page["page"], data, len(data.encode("utf-8")))
+    )
+
+def get_pages(job_id, after=0, db_path=None):
+    """Return the job's finished pages numbered above `after`, in page order."""
+    rows = get_connection(db_path).execute(
+        "SELECT data FROM pages WHERE job_id = ? AND page > ? ORDER BY page", (job_id, after)
+    ).fetchall()
+    return [json.loads(row["data"]) for row in rows]
+
+def get_job(job_id, db_path=None):
+    """Return the job's status and decoded result fields, or None if unknown.
+
+    A queued or running job whose owner has been lost is marked failed first.
+    """
+    row = get_connection(db_path).execute(
+        "SELECT * FROM jobs WHERE job_id = ?", (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    now = time.time()
+    if _is_lost(row, now):
+        _mark_lost(get_connection(db_path), [job_id], now)
+        return get_job(job_id, db_path)
+    job = {name: row[name] for name in ("job_id", "created_at", "updated_at") + STATUS_FIELDS}
+    if row["result"] is not None:
+        data = row["result"]
+        if row["compressed"]:
+            data = zlib.decompress(data)
+        job.update(json.loads(data))
+    return job
+
+def evict(db_path=None, now=None):
+    """Fail lost jobs, drop expired jobs, then the oldest finished jobs until under RESULT_MAX_BYTES.
+
+    A job's size is its stored result plus its per-page rows.
+    """
+    conn = get_connection(db_path)
+    now = time.time() if now is None else now
+    fail_lost_jobs(db_path, now)
+    expired = conn.execute(
+        "DELETE FROM jobs WHERE updated_at < ?", (now - RESULT_TTL_SECONDS,)
+    ).rowcount
+    total = (conn.execute("SELECT COALESCE(SUM(result_size), 0) FROM jobs").fetchone()[0]
+             + conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0])
+    dropped = 0
+    if total > RESULT_MAX_BYTES:
+        rows = conn.execute("""
+            SELECT job_id, result_size + COALESCE(
+                (SELECT SUM(size) FROM pages WHERE pages.job_id = jobs.job_id), 0
+            ) AS size
+            FROM jobs WHERE status IN ('done', 'failed') ORDER BY updated_at
+        """).fetchall()
+        doomed = []
+        for row in rows:
+            if total <= RESULT_MAX_BYTES:
+                break
+            doomed.append((row["job_id"],))
+            total -= row["size"]
+        conn.executemany("DELETE FROM jobs WHERE job_id = ?", doomed)
+        dropped = len(doomed)
+    conn.execute("DELETE FROM pages WHERE job_id NOT IN (SELECT job_id FROM jobs)")
+    if expired or dropped:
+        logger.info(f"Evicted {expired} expired and {dropped} oversize OCR results")
+
+def maybe_evict(db_path=None):
+    global _last_evict
+    with _evict_lock:
+        if time.time() - _last_evict < EVICT_INTERVAL_SECONDS:
+            return
+        _last_evict = time.time()
+    try:
+        evict(db_path)
+    except sqlite3.Error as e:
+        logger.error(f"Error evicting OCR results: {e}")
@@ -0,0 +1,135 @@
+"""Per-job scratch directories for OCR engine temp files, kept in a pid-<pid>
+directory per process under SCRATCH_ROOT (tmpfs when available).
+"""
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+def _default_root():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base, "medical-ocr-scratch")
+
+SCRATCH_ROOT = os.environ.get("OCR_SCRATCH_DIR") or _default_root()
+# Workspaces untouched for longer than this are treated as orphans. Must exceed
+# the longest engine timeout (Vision waits up to 10 minutes).
+ORPHAN_MAX_AGE_SECONDS = int(os.environ.get("OCR_SCRATCH_MAX_AGE_SECONDS", str(2 * 3600)))
+SWEEP_INTERVAL_SECONDS = 600
+
+_active = set()
+_active_lock = threading.Lock()
+_sweeper = None
+
+def scratch_root():
+    """Return SCRATCH_ROOT, creating it (private to this user) if needed."""
+    os.makedirs(SCRATCH_ROOT, mode=0o700, exist_ok=True)
+    return SCRATCH_ROOT
+
+def process_root():
+    """Return this process's directory under SCRATCH_ROOT, creating it if needed."""
+    path = os.path.join(scratch_root(), f"pid-{os.getpid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+def create_workspace(job_id=None):
+    """Create and return a new private directory for one job's temp files."""
+    start_sweeper()
+    path = tempfile.mkdtemp(prefix=f"{job_id or 'job'}_", dir=process_root())
+    with _active_lock:
+        _active.add(path)
+    return path
+
+def remove_workspace(path):
+    """Delete a workspace and everything in it."""
+    shutil.rmtree(path, ignore_errors=True)
+    with _active_lock:
+        _active.discard(path)
+
+@contextmanager
+def workspace(job_id=None):
+    """Context manager yielding a workspace directory that is removed on exit."""
+    path = create_workspace(job_id)
+    try:
+        yield path
+    finally:
+        remove_workspace(path)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _remove_stale(entries, max_age, now, active):
+    """Remove the directories among `entries` not in `active` and not modified within `max_age`."""
+    removed = 0
+    for entry in entries:
+        if entry.path in active or not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            if now - entry.stat(follow_symlinks=False).st_mtime < max_age:
+                continue
+        except FileNotFoundError:
+            continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+        removed += 1
+    return removed
+
+def sweep(max_age=None, now=None):
+    """Remove orphaned workspaces; return how many directories were removed.
+
+    Orphans are the directories of exited processes, and this process's own
+    workspaces that are no longer active and untouched for `max_age` seconds.
+    Another live process's workspaces are never touched.
+    """
+    max_age = ORPHAN_MAX_AGE_SECONDS if max_age is None else max_age
+    now = time.time() if now is None else now
+    try:
+        entries = list(os.scandir(SCRATCH_ROOT))
+    except FileNotFoundError:
+        return 0
+    with _active_lock:
+        active = set(_active)
+    removed = 0
+    unowned = []
+    for entry in entries:
+        pid = entry.name[len("pid-"):] if entry.name.startswith("pid-") else ""
+        if not pid.isdigit():
+            # Workspaces from before per-process directories
+            unowned.append(entry)
+        elif int(pid) == os.getpid():
+            try:
+                removed += _remove_stale(list(os.scandir(entry.path)), max_age, now, active)
+            except FileNotFoundError:
+                pass
+        elif not _pid_alive(int(pid)) and entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    removed += _remove_stale(unowned, max_age, now, active)
+    if removed:
+        logger.info(f"Swept {removed} orphaned scratch directories from {SCRATCH_ROOT}")
+    return removed
+
+def _sweep_forever():
+    while True:
+        try:
+            sweep()
+        except OSError as e:
+            logger.error(f"Error sweeping scratch workspaces: {e}")
+        time.sleep(SWEEP_INTERVAL_SECONDS)
+
+def start_sweeper():
+    """Start the background orphan sweeper for this process if it is not running yet."""
+    global _sweeper
+    with _active_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_forever, name="scratch-sweeper", daemon=True)
+            _sweeper.start()
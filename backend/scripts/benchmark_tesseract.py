@@ -0,0 +1,53 @@
+"""Compare per-page OCR overhead of pytesseract (one tesseract process per page)
+against the resident Tesseract engine used by ocr_pages.
+
+Usage: python scripts/benchmark_tesseract.py [image_path] [--pages N] [--lang eng+heb]
+Without an image a short synthetic page is generated, which is the case where
+process startup and traineddata loading dominate.
+"""
+import argparse
+import os
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytesseract
+import ocr_pages
+
+def make_sample_page():
+    image = Image.new('L', (1240, 400), 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(["Patient referral letter", "Blood pressure 120/80", "Follow-up in two weeks"]):
+        draw.text((60, 60 + i * 80), line, fill=0)
+    return image
+
+def time_pages(label, ocr, image, pages):
+    start = time.perf_counter()
+    for _ in range(pages):
+        ocr(image)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {pages} pages in {elapsed:.2f}s  ({elapsed / pages * 1000:.1f} ms/page)")
+    return elapsed / pages
+
+def main():
+    parser = argparse.ArgumentParser(description="Tesseract per-page overhead benchmark")
+    parser.add_argument("image", nargs="?", help="Image to OCR (defaults to a synthetic page)")
+    parser.add_argument("--pages", type=int, default=20, help="Number of pages to OCR per engine")
+    parser.add_argument("--lang", default=ocr_pages.OCR_LANG, help="Tesseract languages")
+    args = parser.parse_args()
+
+    image = Image.open(args.image) if args.image else make_sample_page()
+    image.load()
+
+    subprocess_ms = time_pages("pytesseract", lambda img: pytesseract.image_to_string(img, lang=args.lang), image, args.pages)
+    if ocr_pages.PyTessBaseAPI is None:
+        print("tesserocr is not installed; resident engine benchmark skipped (pip install tesserocr)")
+        return
+    resident_ms = time_pages("resident", lambda img: ocr_pages.ocr_image(img, lang=args.lang), image, args.pages)
+    print(f"Per-page overhead saved: {(subprocess_ms - resident_ms) * 1000:.1f} ms ({subprocess_ms / resident_ms:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gcs_archive
+import main
+
+
+def fake_bucket(uploaded, release=None, error=None):
+    def blob(name):
+        def upload_from_filename(path):
+            if release is not None:
+                release.wait(5)
+            if error:
+                raise error
+            with open(path, "rb") as f:
+                uploaded[name] = f.read()
+        return SimpleNamespace(upload_from_filename=upload_from_filename)
+    return SimpleNamespace(blob=blob)
+
+def test_background_archive_reads_saved_file(monkeypatch, tmp_path):
+    uploaded = {}
+    release = threading.Event()
+    monkeypatch.setattr(gcs_archive, "get_bucket", lambda name: fake_bucket(uploaded, release))
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(b"%PDF-1.4")
+
+    future = gcs_archive.archive_in_background("bucket", str(path), "job_scan.pdf")
+    assert not future.done()
+    release.set()
+    assert future.result(timeout=5) is True
+    assert uploaded == {"job_scan.pdf": b"%PDF-1.4"}
+
+def test_background_archive_failure_is_not_raised(monkeypatch, tmp_path):
+    monkeypatch.setattr(gcs_archive, "get_bucket", lambda name: fake_bucket({}, error=OSError("offline")))
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(b"%PDF-1.4")
+
+    assert gcs_archive.archive_in_background("bucket", str(path), "job_scan.pdf").result(timeout=5) is False
+
+def test_background_archive_backlog_is_bounded(monkeypatch, tmp_path):
+    uploaded = {}
+    release = threading.Event()
+    monkeypatch.setattr(gcs_archive, "get_bucket", lambda name: fake_bucket(uploaded, release))
+    monkeypatch.setattr(gcs_archive, "ARCHIVE_MAX_PENDING", 2)
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(b"%PDF-1.4")
+
+    futures = [gcs_archive.archive_in_background("bucket", str(path), f"job{n}.pdf") for n in range(3)]
+    assert futures[2] is None
+    release.set()
+    assert [f.result(timeout=5) for f in futures[:2]] == [True, True]
+    assert gcs_archive.archive_in_background("bucket", str(path), "job3.pdf").result(timeout=5)
+
+def test_job_deletes_archived_upload_unless_kept(monkeypatch, tmp_path):
+    deleted = []
+    monkeypatch.setattr(main.gcs_cleanup, "schedule_delete", lambda bucket, names: deleted.extend(names))
+    monkeypatch.setattr(main, "real_ocr", lambda path, progress=None: ("text", []))
+    monkeypatch.setattr(gcs_archive, "get_bucket", lambda name: fake_bucket({}))
+    monkeypatch.setattr(gcs_archive, "ARCHIVE_MODE", "sync")
+    for keep in (False, True):
+        monkeypatch.setattr(gcs_archive, "ARCHIVE_KEEP", keep)
+        work_dir = tmp_path / f"keep-{keep}"
+        work_dir.mkdir()
+        (work_dir / "scan.pdf").write_bytes(b"%PDF-1.4")
+        assert main.run_ocr_job(None, str(work_dir / "scan.pdf"), "scan.pdf")["text"] == "text"
+        assert not work_dir.exists()
+    assert deleted == ["scan.pdf"]
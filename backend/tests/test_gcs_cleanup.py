@@ -0,0 +1,83 @@
+import os
+import sys
+from types import SimpleNamespace
+
+from google.api_core.exceptions import NotFound, ServiceUnavailable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gcs_cleanup
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+
+    def __enter__(self):
+        self.client.batches.append([])
+        self.client.in_batch = True
+
+    def __exit__(self, *exc):
+        self.client.in_batch = False
+        for name in self.client.batches[-1]:
+            if name in self.client.broken or name not in self.client.blobs:
+                raise ServiceUnavailable("batch failed")
+            self.client.blobs.discard(name)
+
+class FakeBlob:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def delete(self):
+        if self.client.in_batch:
+            self.client.batches[-1].append(self.name)
+            return
+        if self.name in self.client.broken:
+            raise ServiceUnavailable("try again")
+        if self.name not in self.client.blobs:
+            raise NotFound("gone")
+        self.client.blobs.discard(self.name)
+
+class FakeClient:
+    def __init__(self, blobs, broken=()):
+        self.blobs = set(blobs)
+        self.broken = set(broken)
+        self.batches = []
+        self.in_batch = False
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def bucket(self, name):
+        return SimpleNamespace(
+            blob=lambda blob_name: FakeBlob(self, blob_name),
+            list_blobs=lambda prefix: [SimpleNamespace(name=n) for n in sorted(self.blobs) if n.startswith(prefix)],
+        )
+
+
+def test_deletions_are_batched_and_prefixes_expanded(monkeypatch):
+    client = FakeClient([f"job/page-{i}.json" for i in range(150)] + ["upload.pdf", "keep.pdf"])
+    monkeypatch.setattr(gcs_cleanup, "_get_client", lambda: client)
+
+    gcs_cleanup.process([("bucket", "upload.pdf", None, 1), ("bucket", None, "job/", 1)])
+
+    assert [len(batch) for batch in client.batches] == [100, 51]
+    assert client.blobs == {"keep.pdf"}
+
+def test_failed_deletes_are_retried_then_reported(monkeypatch):
+    client = FakeClient(["a.pdf", "stuck.pdf", "gone.pdf"], broken=["stuck.pdf"])
+    client.blobs.discard("gone.pdf")
+    retried = []
+    monkeypatch.setattr(gcs_cleanup, "_get_client", lambda: client)
+    monkeypatch.setattr(gcs_cleanup, "_retry_or_fail", lambda *args: retried.append(args))
+
+    gcs_cleanup.process([("bucket", name, None, 2) for name in ("a.pdf", "stuck.pdf", "gone.pdf")])
+
+    assert client.blobs == {"stuck.pdf"}
+    assert [(args[1], args[3]) for args in retried] == [("stuck.pdf", 2)]
+
+def test_last_attempt_is_recorded_as_failed(monkeypatch):
+    monkeypatch.setattr(gcs_cleanup, "_failed_blobs", gcs_cleanup.deque(maxlen=100))
+    gcs_cleanup._retry_or_fail("bucket", "stuck.pdf", None, gcs_cleanup.CLEANUP_MAX_ATTEMPTS, RuntimeError("503"))
+    assert gcs_cleanup.stats()["failed_blobs"] == ["gs://bucket/stuck.pdf"]
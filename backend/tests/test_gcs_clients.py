@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gcs_clients
+
+
+class FakeSession:
+    def __init__(self):
+        self.adapters = {}
+
+    def mount(self, prefix, adapter):
+        self.adapters[prefix] = adapter
+
+class FakeBucket:
+    def __init__(self, name, exists):
+        self.name = name
+        self.exists_calls = 0
+        self._exists = exists
+
+    def exists(self):
+        self.exists_calls += 1
+        return self._exists
+
+class FakeStorageClient:
+    created = 0
+
+    def __init__(self):
+        FakeStorageClient.created += 1
+        self._http = FakeSession()
+
+    def bucket(self, name):
+        return FakeBucket(name, exists=name != "missing")
+
+
+def reset(monkeypatch):
+    FakeStorageClient.created = 0
+    monkeypatch.setattr(gcs_clients.storage, "Client", FakeStorageClient)
+    monkeypatch.setattr(gcs_clients, "_storage_client", None)
+    monkeypatch.setattr(gcs_clients, "_buckets", {})
+    monkeypatch.setattr(gcs_clients, "_verified_buckets", set())
+
+def test_storage_client_is_created_once_across_threads(monkeypatch):
+    reset(monkeypatch)
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(gcs_clients.get_storage_client())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert FakeStorageClient.created == 1
+    assert all(client is clients[0] for client in clients)
+    assert clients[0]._http.adapters["https://"]._pool_maxsize == gcs_clients.GCS_POOL_SIZE
+
+def test_bucket_check_is_cached_only_after_success(monkeypatch):
+    reset(monkeypatch)
+    assert gcs_clients.bucket_exists("records")
+    assert gcs_clients.bucket_exists("records")
+    assert gcs_clients.get_bucket("records").exists_calls == 1
+    assert not gcs_clients.bucket_exists("missing")
+    assert not gcs_clients.bucket_exists("missing")
+    assert gcs_clients.get_bucket("missing").exists_calls == 2
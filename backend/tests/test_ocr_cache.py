@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_cache
+
+
+def test_key_depends_on_content_engine_and_settings(tmp_path):
+    a = tmp_path / "a.pdf"
+    b = tmp_path / "b.pdf"
+    a.write_bytes(b"same bytes")
+    b.write_bytes(b"same bytes")
+    assert ocr_cache.cache_key(str(a), "tesseract", dpi=200) == ocr_cache.cache_key(str(b), "tesseract", dpi=200)
+    assert ocr_cache.cache_key(str(a), "tesseract", dpi=200) != ocr_cache.cache_key(str(a), "tesseract", dpi=300)
+    assert ocr_cache.cache_key(str(a), "tesseract", dpi=200) != ocr_cache.cache_key(str(a), "abbyy", dpi=200)
+
+def test_hits_misses_and_lru_eviction(tmp_path, monkeypatch):
+    db = str(tmp_path / "cache.db")
+    assert ocr_cache.get("k1", db_path=db) is None
+    ocr_cache.put("k1", "tesseract", {"text": "one"}, db_path=db)
+    ocr_cache.put("k2", "tesseract", {"text": "two"}, db_path=db)
+    assert ocr_cache.get("k1", db_path=db) == {"text": "one"}
+
+    entry_size = ocr_cache.stats(db_path=db)["bytes"] // 2
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_MAX_BYTES", entry_size * 2)
+    ocr_cache.put("k3", "tesseract", {"text": "six"}, db_path=db)
+    # k2 was the least recently used entry
+    assert ocr_cache.get("k2", db_path=db) is None
+    assert ocr_cache.get("k1", db_path=db) is not None
+
+    stats = ocr_cache.stats(db_path=db)
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1)
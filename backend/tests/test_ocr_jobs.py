@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_jobs
+import result_store
+
+
+def wait_for_status(job_id, statuses, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = ocr_jobs.get_job(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {statuses}")
+
+def test_job_goes_from_queued_to_running_to_done(monkeypatch, tmp_path):
+    monkeypatch.setattr(result_store, "RESULT_DB_PATH", str(tmp_path / "results.db"))
+    started, release = threading.Event(), threading.Event()
+
+    def job(progress, name):
+        started.set()
+        release.wait(5)
+        progress(1, 2, {"page": 1, "text": "first"})
+        return {"text": f"text of {name}"}
+
+    ocr_jobs.enqueue_job("job-1", job, "scan.pdf")
+    assert ocr_jobs.get_job("job-1")["status"] in (ocr_jobs.QUEUED, ocr_jobs.RUNNING)
+    started.wait(5)
+    assert ocr_jobs.get_job("job-1")["status"] == ocr_jobs.RUNNING
+    release.set()
+
+    done = wait_for_status("job-1", (ocr_jobs.DONE, ocr_jobs.FAILED))
+    assert done["status"] == ocr_jobs.DONE
+    assert done["text"] == "text of scan.pdf"
+    assert (done["pages_done"], done["pages_total"]) == (1, 2)
+    assert [page["text"] for page in ocr_jobs.get_pages("job-1")] == ["first"]
+
+def test_job_exception_marks_it_failed(monkeypatch, tmp_path):
+    monkeypatch.setattr(result_store, "RESULT_DB_PATH", str(tmp_path / "results.db"))
+
+    def job(progress):
+        raise RuntimeError("pdftoppm crashed")
+
+    ocr_jobs.enqueue_job("job-2", job)
+    failed = wait_for_status("job-2", (ocr_jobs.DONE, ocr_jobs.FAILED))
+    assert failed["status"] == ocr_jobs.FAILED
+    assert failed["error"] == "pdftoppm crashed"
+    assert ocr_jobs.get_job("missing") is None
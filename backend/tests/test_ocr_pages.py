@@ -0,0 +1,104 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_pages
+
+
+class FakeImage:
+    def __init__(self, page):
+        self.page = page
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+def fake_renderer(calls):
+    def convert_from_path(pdf_path, dpi, first_page, last_page):
+        calls.append((first_page, last_page))
+        return [FakeImage(page) for page in range(first_page, last_page + 1)]
+    return convert_from_path
+
+def test_pages_are_rendered_in_windows_of_consecutive_pages(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_pages, "convert_from_path", fake_renderer(calls))
+
+    seen = []
+    for page_number, image in ocr_pages.iter_pdf_pages("scan.pdf", pages=[6, 1, 2, 3, 5], window=2):
+        assert image.page == page_number and not image.closed
+        assert all(previous.closed for previous in seen)
+        seen.append(image)
+
+    assert [image.page for image in seen] == [1, 2, 3, 5, 6]
+    assert calls == [(1, 2), (3, 3), (5, 6)]
+    assert all(image.closed for image in seen)
+
+
+def test_pool_workers_are_not_forked_from_the_server():
+    try:
+        executor = ocr_pages.get_ocr_executor(2)
+        assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert executor.submit(os.getpid).result(timeout=60) != os.getpid()
+    finally:
+        ocr_pages._reset_ocr_executor()
+
+def test_pool_and_serial_paths_give_the_same_pages(monkeypatch):
+    monkeypatch.setattr(ocr_pages, "convert_from_path", fake_renderer([]))
+    monkeypatch.setattr(ocr_pages, "extract_page_image", lambda pdf_path, page: FakeImage(page))
+    monkeypatch.setattr(ocr_pages, "recognize_image", lambda image, lang: (f"page {image.page}", 90))
+    monkeypatch.setattr(ocr_pages, "count_pdf_pages", lambda pdf_path: 6)
+    monkeypatch.setattr(ocr_pages, "text_layer_pages", lambda pdf_path: {2: "typed page 2"})
+    monkeypatch.setattr(ocr_pages, "full_page_image_pages", lambda pdf_path, total: {4})
+    # A thread pool stands in for the process pool so the patches above apply.
+    executor = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(ocr_pages, "get_ocr_executor", lambda workers, lang: executor)
+
+    def run(workers):
+        return [{k: v for k, v in page.items() if k != "elapsed"}
+                for page in ocr_pages.iter_pdf_text("scan.pdf", workers=workers)]
+
+    serial, pooled = run(1), run(3)
+    executor.shutdown()
+
+    assert serial == pooled
+    assert [page["text"] for page in serial] == ["page 1", "typed page 2", "page 3", "page 4", "page 5", "page 6"]
+    assert [page["source"] for page in serial] == [
+        "rendered", "text_layer", "rendered", "embedded_image", "rendered", "rendered"
+    ]
+
+class FakeEngine:
+    created = 0
+
+    def __init__(self, lang):
+        FakeEngine.created += 1
+
+    def Clear(self):
+        pass
+
+def test_resident_engines_are_reused_and_only_added_when_busy(monkeypatch):
+    monkeypatch.setattr(ocr_pages, "PyTessBaseAPI", FakeEngine)
+    monkeypatch.setattr(ocr_pages, "_idle_engines", {})
+    monkeypatch.setattr(ocr_pages, "TESSDATA_PREFIX", None)
+    FakeEngine.created = 0
+
+    for _ in range(3):
+        with ocr_pages.tesseract_engine("heb") as engine:
+            first = engine
+    assert FakeEngine.created == 1
+    with ocr_pages.tesseract_engine("heb") as engine, ocr_pages.tesseract_engine("heb") as busy:
+        assert engine is first and busy is not first
+    assert FakeEngine.created == 2
+
+def test_pool_workers_preload_the_callers_language(monkeypatch):
+    preloaded = []
+
+    class RecordingPool:
+        def __init__(self, max_workers, initializer, initargs, mp_context):
+            preloaded.append(initargs)
+
+    monkeypatch.setattr(ocr_pages, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(ocr_pages, "_executor", None)
+    ocr_pages.get_ocr_executor(2, "heb+eng")
+    assert preloaded == [("heb+eng",)]
@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def stream(monkeypatch, pages, status, headers=None):
+    monkeypatch.setattr(main, "get_job", lambda job_id: {"status": status, "pages_total": len(pages), "error": None})
+    monkeypatch.setattr(main, "get_pages", lambda job_id, after=0: [p for p in pages if p["page"] > after])
+    monkeypatch.setattr(main, "STREAM_POLL_SECONDS", 0)
+    response = main.app.test_client().get("/api/ocr/pdf/stream/job-1", headers=headers or {})
+    return response.get_data(as_text=True)
+
+def test_pages_carry_ids_and_resume_after_last_event_id(monkeypatch):
+    pages = [{"page": n, "text": f"page {n}"} for n in (1, 2, 3)]
+    body = stream(monkeypatch, pages, "done")
+    assert "id: 1\nevent: page" in body and "id: 3\nevent: page" in body
+    assert "event: done" in body
+
+    resumed = stream(monkeypatch, pages, "done", headers={"Last-Event-ID": "2"})
+    assert "id: 2\n" not in resumed
+    assert resumed.count("event: page") == 1 and "id: 3\n" in resumed
+
+def test_stream_closes_after_max_seconds(monkeypatch):
+    monkeypatch.setattr(main, "STREAM_MAX_SECONDS", 0)
+    body = stream(monkeypatch, [{"page": 1, "text": "page 1"}], "running")
+    assert "id: 1\nevent: page" in body
+    assert "event: done" not in body and "event: failed" not in body
@@ -0,0 +1,58 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_page_images
+
+PDFINFO = """Pages:          5
+Page    1 size: 612 x 792 pts (letter)
+Page    1 rot:  0
+Page    2 size: 612 x 792 pts (letter)
+Page    2 rot:  90
+Page    3 size: 612 x 792 pts (letter)
+Page    3 rot:  0
+Page    4 size: 612 x 792 pts (letter)
+Page    4 rot:  0
+Page    5 size: 612 x 792 pts (letter)
+Page    5 rot:  0
+"""
+
+PDFIMAGES_LIST = """page   num  type   width height color comp bpc  enc interp  object ID x-ppi y-ppi size ratio
+--------------------------------------------------------------------------------------------
+   1     0 image    2550  3300  gray    1   8  jpeg   no         9  0   300   300  512K 6.2%
+   2     1 image    2550  3300  gray    1   8  jpeg   no        12  0   300   300  512K 6.2%
+   3     2 image     600   400  rgb     3   8  image  no        15  0   300   300  100K  14%
+   4     3 image    2550  3300  gray    1   8  jpeg   no        18  0   300   300  512K 6.2%
+   4     4 smask    2550  3300  gray    1   8  image  no        19  0   300   300   10K 0.1%
+   5     5 image     850  1100  gray    1   1  ccitt  no        22  0   100   100   20K 1.7%
+"""
+
+
+def fake_poppler(monkeypatch, outputs):
+    def run(args, capture_output, timeout):
+        return SimpleNamespace(returncode=0, stdout=outputs[args[0]].encode("utf-8"), stderr=b"")
+    monkeypatch.setattr(pdf_page_images.subprocess, "run", run)
+
+def test_pdfinfo_and_pdfimages_output_is_parsed(monkeypatch):
+    fake_poppler(monkeypatch, {"pdfinfo": PDFINFO, "pdfimages": PDFIMAGES_LIST})
+
+    geometry = pdf_page_images.page_geometry("scan.pdf", 5)
+    images = pdf_page_images.list_page_images("scan.pdf")
+
+    assert geometry[1] == (612.0, 792.0, 0) and geometry[2] == (612.0, 792.0, 90)
+    assert images[1] == [{"type": "image", "width": 2550, "height": 3300,
+                          "encoding": "jpeg", "x_ppi": 300.0, "y_ppi": 300.0}]
+    assert [image["type"] for image in images[4]] == ["image", "smask"]
+
+def test_only_single_full_page_upright_images_qualify(monkeypatch):
+    fake_poppler(monkeypatch, {"pdfinfo": PDFINFO, "pdfimages": PDFIMAGES_LIST})
+    # 2: rotated, 3: covers part of the page, 4: has a mask, 5: below MIN_IMAGE_DPI
+    assert pdf_page_images.full_page_image_pages("scan.pdf", 5) == {1}
+
+def test_poppler_failure_means_no_image_pages(monkeypatch):
+    def run(args, capture_output, timeout):
+        raise FileNotFoundError(args[0])
+    monkeypatch.setattr(pdf_page_images.subprocess, "run", run)
+    assert pdf_page_images.full_page_image_pages("scan.pdf", 5) == set()
@@ -0,0 +1,45 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_text_layer
+
+
+def test_empty_page_is_not_usable_even_without_a_minimum(monkeypatch):
+    monkeypatch.setattr(pdf_text_layer, "MIN_TEXT_LAYER_CHARS", 0)
+    assert not pdf_text_layer.has_usable_text_layer("")
+    assert not pdf_text_layer.has_usable_text_layer("\n\n")
+    assert pdf_text_layer.has_usable_text_layer("Discharge letter")
+
+def test_garbled_or_short_text_layers_are_rejected():
+    letter = "Patient discharged in good condition after treatment. " * 2
+    assert pdf_text_layer.has_usable_text_layer(letter)
+    assert not pdf_text_layer.has_usable_text_layer("Page 1")
+    assert not pdf_text_layer.has_usable_text_layer(letter + "\ufffd" * 20)
+
+def fake_pdftotext(monkeypatch, stdout, returncode=0):
+    calls = []
+
+    def run(args, capture_output, timeout):
+        calls.append(args)
+        return SimpleNamespace(returncode=returncode, stdout=stdout.encode("utf-8"), stderr=b"broken")
+    monkeypatch.setattr(pdf_text_layer.subprocess, "run", run)
+    return calls
+
+def test_text_layer_pages_keep_only_usable_pages(monkeypatch):
+    typed = "Blood pressure 120/80, heart rate 72, no acute distress noted on examination."
+    calls = fake_pdftotext(monkeypatch, f"{typed}\f\f{typed} again\f")
+
+    assert pdf_text_layer.text_layer_pages("chart.pdf") == {1: typed, 3: f"{typed} again"}
+    assert pdf_text_layer.born_digital_text("chart.pdf") is None
+    assert calls[0][:3] == ["pdftotext", "-enc", "UTF-8"]
+
+def test_born_digital_text_needs_every_page(monkeypatch):
+    typed = "Blood pressure 120/80, heart rate 72, no acute distress noted on examination."
+    fake_pdftotext(monkeypatch, f"{typed}\f {typed}\n\f")
+    assert pdf_text_layer.born_digital_text("chart.pdf") == f"{typed}\n{typed}"
+
+    fake_pdftotext(monkeypatch, "", returncode=1)
+    assert pdf_text_layer.text_layer_pages("chart.pdf") == {}
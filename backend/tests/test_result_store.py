@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import socket
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import result_store
+
+
+def test_job_roundtrip(tmp_path):
+    db = str(tmp_path / "results.db")
+    result_store.create_job("job-1", "queued", db_path=db)
+    result_store.update_job("job-1", db_path=db, status="running", pages_done=2, pages_total=5)
+    job = result_store.get_job("job-1", db_path=db)
+    assert job["status"] == "running"
+    assert (job["pages_done"], job["pages_total"]) == (2, 5)
+    assert result_store.get_job("missing", db_path=db) is None
+
+def test_large_results_are_compressed(tmp_path):
+    db = str(tmp_path / "results.db")
+    text = "שלום עולם " * 2000
+    result_store.create_job("job-1", "queued", db_path=db)
+    result_store.save_result("job-1", {"text": text, "pages": []}, db_path=db, status="done")
+    row = result_store.get_connection(db).execute(
+        "SELECT compressed, result_size FROM jobs WHERE job_id = 'job-1'"
+    ).fetchone()
+    assert row["compressed"] == 1
+    assert row["result_size"] < len(text.encode("utf-8"))
+    assert result_store.get_job("job-1", db_path=db)["text"] == text
+
+def test_evict_by_ttl_and_size(tmp_path, monkeypatch):
+    db = str(tmp_path / "results.db")
+    for job_id in ("old", "a", "b"):
+        result_store.create_job(job_id, "queued", db_path=db)
+        result_store.save_result(job_id, {"text": job_id * 100}, db_path=db, status="done")
+    result_store.get_connection(db).execute("UPDATE jobs SET updated_at = 0 WHERE job_id = 'old'")
+    result_store.get_connection(db).execute("UPDATE jobs SET updated_at = updated_at - 1 WHERE job_id = 'a'")
+    monkeypatch.setattr(result_store, "RESULT_MAX_BYTES", 150)
+    result_store.evict(db_path=db, now=time.time())
+    assert result_store.get_job("old", db_path=db) is None
+    assert result_store.get_job("a", db_path=db) is None
+    assert result_store.get_job("b", db_path=db) is not None
+
+def test_pages_are_returned_in_order_after_cursor(tmp_path):
+    db = str(tmp_path / "results.db")
+    result_store.create_job("job-1", "running", db_path=db)
+    for page in (2, 1, 3):
+        result_store.save_page("job-1", {"page": page, "text": f"page {page}"}, db_path=db)
+    assert [p["page"] for p in result_store.get_pages("job-1", db_path=db)] == [1, 2, 3]
+    assert [p["text"] for p in result_store.get_pages("job-1", after=2, db_path=db)] == ["page 3"]
+
+def test_jobs_of_exited_or_silent_owners_are_failed(tmp_path):
+    db = str(tmp_path / "results.db")
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    for job_id in ("dead-owner", "silent", "alive"):
+        result_store.create_job(job_id, "running", db_path=db)
+    conn = result_store.get_connection(db)
+    conn.execute("UPDATE jobs SET owner = ? WHERE job_id = 'dead-owner'", (f"{socket.gethostname()}:{child.pid}",))
+    conn.execute("UPDATE jobs SET heartbeat = 0, updated_at = 0 WHERE job_id = 'silent'")
+
+    job = result_store.get_job("dead-owner", db_path=db)
+    assert job["status"] == "failed" and job["error"] == result_store.LOST_JOB_ERROR
+    assert result_store.fail_lost_jobs(db_path=db) == 1
+    assert result_store.get_job("silent", db_path=db)["status"] == "failed"
+    assert result_store.get_job("alive", db_path=db)["status"] == "running"
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scratch
+
+
+def test_workspaces_are_private_and_removed_on_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(scratch, "SCRATCH_ROOT", str(tmp_path))
+    with pytest.raises(RuntimeError):
+        with scratch.workspace("job") as first, scratch.workspace("job") as second:
+            assert first != second
+            with open(os.path.join(first, "page.xml"), "w") as f:
+                f.write("partial")
+            raise RuntimeError("engine crashed")
+    assert os.listdir(scratch.process_root()) == []
+
+def test_sweep_removes_only_stale_inactive_workspaces(tmp_path, monkeypatch):
+    monkeypatch.setattr(scratch, "SCRATCH_ROOT", str(tmp_path))
+    own = scratch.process_root()
+    old = time.time() - 3600
+    orphan = os.path.join(own, "job_orphan")
+    os.mkdir(orphan)
+    with open(os.path.join(orphan, "left.json"), "w") as f:
+        f.write("{}")
+    os.utime(orphan, (old, old))
+    os.mkdir(os.path.join(own, "job_fresh"))
+    active = scratch.create_workspace("job")
+    os.utime(active, (old, old))
+    try:
+        assert scratch.sweep(max_age=600) == 1
+        assert sorted(os.listdir(own)) == sorted(["job_fresh", os.path.basename(active)])
+    finally:
+        scratch.remove_workspace(active)
+
+def test_sweep_leaves_live_processes_alone_and_clears_exited_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(scratch, "SCRATCH_ROOT", str(tmp_path))
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    old = time.time() - 3600
+    for pid in (os.getppid(), exited.pid):
+        queued = tmp_path / f"pid-{pid}" / "job_queued"
+        queued.mkdir(parents=True)
+        os.utime(queued, (old, old))
+
+    assert scratch.sweep(max_age=600) == 1
+    assert os.listdir(tmp_path) == [f"pid-{os.getppid()}"]
+    assert os.listdir(tmp_path / f"pid-{os.getppid()}") == ["job_queued"]
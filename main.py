@@ -2,15 +2,14 @@ from flask import Flask, request, jsonify
 import os
 import subprocess
 import json
+import time
 import logging
-from ocr_pdf_async import (
-    upload_gcs_file,
-    async_ocr_pdf,
-    download_gcs_results,
-    parse_ocr_results,
-    delete_gcs_file,
-    delete_gcs_results
-)
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ocr_pdf_async import google_ocr_files
+from backend.pdf_text_layer import born_digital_text
+from backend import ocr_cache, scratch, gcs_cleanup
+import abbyy_worker
 import requests
 
 # Configure logging
@@ -22,90 +21,378 @@ app = Flask(__name__)
 # Set environment variables
 GCS_BUCKET_NAME = "hebrew-ocr-app-bucket-gilsweed-20240516"
 UPLOAD_FOLDER = "/tmp"
+ABBYY_CLI_PATH = os.environ.get(
+    "ABBYY_CLI_PATH",
+    "/Users/gilsweed/Desktop/Brurya/ABBYY_SDK/Samples/CommandLineInterface/CommandLineInterface"
+)
+# "accurate" runs every page in Accurate mode; "adaptive" runs Fast first and
+# re-runs only pages whose average confidence is below ABBYY_ESCALATION_CONFIDENCE.
+OCR_ENGINES = ("abbyy", "google")
+ABBYY_MODES = ("accurate", "adaptive")
+ABBYY_MODE = os.environ.get("ABBYY_MODE", "accurate").lower()
+ABBYY_ESCALATION_CONFIDENCE = float(os.environ.get("ABBYY_ESCALATION_CONFIDENCE", "80"))
+# Concurrent ABBYY recognitions per server process; set to the licence's core count.
+ABBYY_WORKERS = max(1, int(os.environ.get("ABBYY_WORKERS", str(os.cpu_count() or 1))))
+
+# Most files passed to one CLI invocation by /api/process_batch.
+ABBYY_BATCH_SIZE = max(1, int(os.environ.get("ABBYY_BATCH_SIZE", "10")))
+
+_abbyy_executor = None
+_abbyy_executor_lock = threading.Lock()
+
+def get_abbyy_executor():
+    """Return the process-wide pool that bounds concurrent ABBYY runs to ABBYY_WORKERS."""
+    global _abbyy_executor
+    with _abbyy_executor_lock:
+        if _abbyy_executor is None:
+            _abbyy_executor = ThreadPoolExecutor(max_workers=ABBYY_WORKERS, thread_name_prefix="abbyy")
+        return _abbyy_executor
+
+def _abbyy_cache_key(file_path, mode):
+    if mode == "adaptive":
+        return ocr_cache.cache_key(file_path, "abbyy", mode="Adaptive", threshold=ABBYY_ESCALATION_CONFIDENCE)
+    return ocr_cache.cache_key(file_path, "abbyy", mode="Accurate")
+
+def abbyy_ocr_result(file_path, mode=None):
+    """Recognize a file with ABBYY, using the cache when possible.
+
+    `mode` is "accurate" (one Accurate pass) or "adaptive" (Fast pass, then
+    Accurate only for pages below ABBYY_ESCALATION_CONFIDENCE); it defaults to
+    ABBYY_MODE. Returns a dict with text, confidence, error, mode and
+    escalated_pages (page numbers re-run in Accurate mode; adaptive only).
+    """
+    mode = (mode or ABBYY_MODE).lower()
+    if mode not in ABBYY_MODES:
+        return {"text": None, "confidence": None, "error": f"ABBYY: Unknown mode: {mode}",
+                "mode": mode, "escalated_pages": []}
+    try:
+        cache_key = _abbyy_cache_key(file_path, mode)
+    except OSError as e:
+        return {"text": None, "confidence": None, "error": f"ABBYY: Error: {str(e)}",
+                "mode": mode, "escalated_pages": []}
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        return dict({"escalated_pages": []}, **cached, error=None, mode=mode)
+    if mode == "adaptive":
+        ocr_text, confidence_level, error, escalated = _run_abbyy_adaptive(file_path)
+    else:
+        (ocr_text, confidence_level, error), escalated = _run_abbyy_cli(file_path), []
+    if error is None:
+        ocr_cache.put(cache_key, "abbyy", {
+            "text": ocr_text, "confidence": confidence_level, "escalated_pages": escalated
+        })
+    return {"text": ocr_text, "confidence": confidence_level, "error": error,
+            "mode": mode, "escalated_pages": escalated}
+
+def run_abbyy_ocr(file_path, mode=None):
+    result = abbyy_ocr_result(file_path, mode)
+    return result["text"], result["confidence"], result["error"]
+
+def timed_abbyy_ocr(file_path, mode=None):
+    """abbyy_ocr_result plus the seconds it took, for reporting per-file timing."""
+    started = time.monotonic()
+    result = abbyy_ocr_result(file_path, mode)
+    result["elapsed"] = round(time.monotonic() - started, 3)
+    return result
+
+def abbyy_ocr_batch(file_paths, mode=None):
+    """Recognize several files, in one ABBYY invocation where possible.
+
+    Returns one abbyy_ocr_result-style dict (with elapsed) per path, in order.
+    Only plain Accurate runs through the CLI are batched: adaptive mode needs a
+    per-file decision, and resident workers already pay start-up only once.
+    Batched files report their share of the invocation's wall time.
+    """
+    mode = (mode or ABBYY_MODE).lower()
+    if mode != "accurate" or abbyy_worker.ABBYY_WORKER_CMD or len(file_paths) < 2:
+        return [timed_abbyy_ocr(file_path, mode) for file_path in file_paths]
+    
+    started = time.monotonic()
+    results, cache_keys = {}, {}
+    for file_path in file_paths:
+        try:
+            cache_keys[file_path] = _abbyy_cache_key(file_path, mode)
+        except OSError as e:
+            results[file_path] = {"text": None, "confidence": None, "error": f"ABBYY: Error: {str(e)}"}
+            continue
+        cached = ocr_cache.get(cache_keys[file_path])
+        if cached is not None:
+            results[file_path] = dict(cached, error=None)
+    
+    pending = list(dict.fromkeys(path for path in file_paths if path not in results))
+    if pending:
+        recognized = _run_abbyy_cli_batch(pending)
+        for file_path in pending:
+            ocr_text, confidence_level, error = recognized[file_path]
+            if error is None:
+                ocr_cache.put(cache_keys[file_path], "abbyy", {
+                    "text": ocr_text, "confidence": confidence_level, "escalated_pages": []
+                })
+            results[file_path] = {"text": ocr_text, "confidence": confidence_level, "error": error}
+    
+    elapsed = round((time.monotonic() - started) / max(len(pending), 1), 3)
+    return [
+        dict(results[file_path], mode=mode, escalated_pages=[],
+             elapsed=elapsed if file_path in pending else 0.0)
+        for file_path in file_paths
+    ]
+
+def text_layer_confidence(engine):
+    """Confidence reported for embedded-text results, on the requested engine's scale.
+
+    ABBYY confidences run 0-100; the Google path reports 0-1.
+    """
+    return 100.0 if engine.lower() == 'abbyy' else 1.0
+
+def google_ocr_batch(file_paths):
+    """Google Vision text for each file, in order, as dicts with text, error and cached.
 
-def run_abbyy_ocr(file_path, batch_mode=False):
-    output_txt = f"{os.path.splitext(os.path.basename(file_path))[0]}_abbyy_ocr.txt"
-    output_xml = f"{os.path.splitext(os.path.basename(file_path))[0]}_abbyy_ocr.xml"
-    abbyy_cli_path = "/Users/gilsweed/Desktop/Brurya/ABBYY_SDK/Samples/CommandLineInterface/CommandLineInterface"
+    Cached files are answered from the OCR cache; the rest go to Vision together
+    so images can share inline requests.
+    """
+    results, cache_keys = {}, {}
+    for file_path in file_paths:
+        try:
+            cache_keys[file_path] = ocr_cache.cache_key(file_path, "google", feature="DOCUMENT_TEXT_DETECTION")
+        except OSError as e:
+            results[file_path] = {"text": None, "error": f"Google Vision OCR error: {str(e)}", "cached": False}
+            continue
+        cached = ocr_cache.get(cache_keys[file_path])
+        if cached is not None:
+            results[file_path] = {"text": cached["text"], "error": None, "cached": True}
     
-    # Set environment variables for this process
+    pending = list(dict.fromkeys(path for path in file_paths if path not in results))
+    for file_path, (ocr_text, error) in zip(pending, google_ocr_files(GCS_BUCKET_NAME, pending)):
+        if error is None:
+            ocr_cache.put(cache_keys[file_path], "google", {"text": ocr_text})
+        results[file_path] = {"text": ocr_text, "error": error, "cached": False}
+    return [results[file_path] for file_path in file_paths]
+
+def _abbyy_env():
+    """Environment for the ABBYY CLI and engine workers."""
     env = os.environ.copy()
     env['FRENGINE_ROOT'] = '/Users/gilsweed/Desktop/Brurya/ABBYY_SDK/FREngine.framework'
     env['DYLD_LIBRARY_PATH'] = '/Users/gilsweed/Desktop/Brurya/ABBYY_SDK/FREngine.framework/Versions/Current/Libraries'
     env['DYLD_FALLBACK_LIBRARY_PATH'] = '/Users/gilsweed/Desktop/Brurya/ABBYY_SDK/FREngine.framework/Versions/Current/Libraries'
     env['DYLD_FRAMEWORK_PATH'] = '/Users/gilsweed/Desktop/Brurya/ABBYY_SDK'
-    
-    try:
-        # First run with XML output to get confidence levels
-        xml_result = subprocess.run(
-            [
-                abbyy_cli_path,
-                "-if", file_path,
-                "-of", output_xml,
-                "-f", "XML",
-                "-rm", "Accurate"
-            ],
-            capture_output=True, text=True, timeout=300,
-            env=env
-        )
+    return env
+
+def _abbyy_recognize(file_path, output_xml, mode):
+    """Run one ABBYY recognition into an XML export; return None or an error message."""
+    if abbyy_worker.ABBYY_WORKER_CMD:
+        with abbyy_worker.engine_worker(_abbyy_env()) as worker:
+            worker_error = worker.recognize(file_path, output_xml, mode=mode)
+        return f"ABBYY: XML generation error: {worker_error}" if worker_error else None
+    xml_result = subprocess.run(
+        [
+            ABBYY_CLI_PATH,
+            "-if", file_path,
+            "-of", output_xml,
+            "-f", "XML",
+            "-rm", mode
+        ],
+        capture_output=True, text=True, timeout=300,
+        env=_abbyy_env()
+    )
+    if xml_result.returncode != 0:
+        return f"ABBYY: XML generation error: {xml_result.stderr}"
+    return None
+
+def _run_abbyy_cli(file_path):
+    with scratch.workspace("abbyy") as work_dir:
+        output_xml = os.path.join(work_dir, f"{os.path.splitext(os.path.basename(file_path))[0]}_abbyy_ocr.xml")
         
-        if xml_result.returncode != 0:
-            return None, None, f"ABBYY: XML generation error: {xml_result.stderr}"
+        try:
+            # A single recognition pass: the XML export carries both the characters
+            # and their confidences, so the plain text is rebuilt from it.
+            error = _abbyy_recognize(file_path, output_xml, "Accurate")
+            if error:
+                return None, None, error
             
-        # Parse XML to get confidence levels
-        confidence_level = parse_confidence_from_xml(output_xml)
+            # Parse XML to get confidence levels and text in one streaming pass
+            parsed = parse_abbyy_xml(output_xml)
+            ocr_text, confidence_level = parsed["text"], parsed["confidence"]
         
-        # Then run with text output
-        text_result = subprocess.run(
-            [
-                abbyy_cli_path,
-                "-if", file_path,
-                "-of", output_txt,
-                "-f", "Text",
-                "-rm", "Accurate"
-            ],
-            capture_output=True, text=True, timeout=300,
-            env=env
-        )
+            return ocr_text, confidence_level, None
+        
+        except Exception as e:
+            return None, None, f"ABBYY: Error: {str(e)}"
+
+def _run_abbyy_cli_batch(file_paths):
+    """Recognize several files with one CLI invocation; return {path: (text, confidence, error)}.
+
+    Each input gets its own "-if/-of" pair, so the engine starts once for the
+    whole batch. Files whose export is missing or unreadable afterwards (a bad
+    input, a crash part-way through) are re-run on their own.
+    """
+    results = {}
+    with scratch.workspace("abbyy-batch") as work_dir:
+        outputs = [
+            os.path.join(work_dir, f"{i}_{os.path.splitext(os.path.basename(path))[0]}_abbyy_ocr.xml")
+            for i, path in enumerate(file_paths)
+        ]
+        command = [ABBYY_CLI_PATH]
+        for file_path, output_xml in zip(file_paths, outputs):
+            command += ["-if", file_path, "-of", output_xml]
+        command += ["-f", "XML", "-rm", "Accurate"]
+        try:
+            batch_result = subprocess.run(
+                command, capture_output=True, text=True, timeout=300 * len(file_paths), env=_abbyy_env()
+            )
+            if batch_result.returncode != 0:
+                logger.warning(f"ABBYY batch of {len(file_paths)} files exited with "
+                               f"{batch_result.returncode}: {batch_result.stderr}")
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"ABBYY batch of {len(file_paths)} files failed: {e}")
         
-        if text_result.returncode != 0:
-            return None, None, f"ABBYY: Text generation error: {text_result.stderr}"
+        for file_path, output_xml in zip(file_paths, outputs):
+            if not os.path.exists(output_xml):
+                continue
+            try:
+                parsed = parse_abbyy_xml(output_xml)
+            except Exception as e:
+                logger.warning(f"Unreadable ABBYY batch output for {file_path}: {e}")
+                continue
+            results[file_path] = (parsed["text"], parsed["confidence"], None)
+    
+    for file_path in file_paths:
+        if file_path not in results:
+            results[file_path] = _run_abbyy_cli(file_path)
+    return results
+
+def _page_subset(file_path, pages, work_dir):
+    """Write the given pages of a PDF to a new PDF in work_dir and return its path.
+
+    Returns None when the file is not a PDF or poppler can't split it, in which
+    case the whole document has to be re-run.
+    """
+    if not file_path.lower().endswith('.pdf'):
+        return None
+    try:
+        singles = []
+        for page in pages:
+            single = os.path.join(work_dir, f"page-{page}.pdf")
+            subprocess.run(
+                ["pdfseparate", "-f", str(page), "-l", str(page), file_path, single],
+                check=True, capture_output=True, timeout=60
+            )
+            singles.append(single)
+        if len(singles) == 1:
+            return singles[0]
+        subset = os.path.join(work_dir, "escalated.pdf")
+        subprocess.run(["pdfunite", *singles, subset], check=True, capture_output=True, timeout=60)
+        return subset
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not extract pages {pages} of {file_path}: {e}")
+        return None
+
+def _run_abbyy_adaptive(file_path):
+    """Fast pass over the whole file, then an Accurate pass over its low-confidence pages.
+
+    Returns (text, confidence, error, escalated_pages).
+    """
+    with scratch.workspace("abbyy") as work_dir:
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        try:
+            fast_xml = os.path.join(work_dir, f"{stem}_fast.xml")
+            error = _abbyy_recognize(file_path, fast_xml, "Fast")
+            if error:
+                return None, None, error, []
+            pages = parse_abbyy_xml(fast_xml, page_text=True)["pages"]
+            # Blank pages have nothing for an Accurate pass to improve; pages with
+            # text but no confidence scores can't pass the gate, so they escalate.
+            escalated = [
+                page["page"] for page in pages
+                if page["text"].strip()
+                and (not page["chars"] or page["confidence"] < ABBYY_ESCALATION_CONFIDENCE)
+            ]
             
-        # Read the OCR text
-        with open(output_txt, 'r', encoding='utf-8') as f:
-            ocr_text = f.read()
+            if escalated:
+                subset = file_path if len(escalated) == len(pages) else _page_subset(file_path, escalated, work_dir)
+                if subset is None:
+                    subset, escalated = file_path, [page["page"] for page in pages]
+                accurate_xml = os.path.join(work_dir, f"{stem}_accurate.xml")
+                error = _abbyy_recognize(subset, accurate_xml, "Accurate")
+                if error:
+                    return None, None, error, escalated
+                accurate_pages = parse_abbyy_xml(accurate_xml, page_text=True)["pages"]
+                if len(accurate_pages) != len(escalated):
+                    return None, None, (f"ABBYY: Error: Accurate pass returned {len(accurate_pages)} "
+                                        f"pages for {len(escalated)} escalated pages"), escalated
+                for page_number, accurate_page in zip(escalated, accurate_pages):
+                    accurate_page["page"] = page_number
+                    pages[page_number - 1] = accurate_page
+                logger.info(f"ABBYY adaptive: escalated pages {escalated} of {len(pages)} in {file_path}")
             
-        # Clean up temporary files
-        os.remove(output_txt)
-        os.remove(output_xml)
+            text = "\n\n".join(page["text"] for page in pages)
+            confidence_level = _average(
+                sum(page["confidence"] * page["chars"] for page in pages),
+                sum(page["chars"] for page in pages)
+            )
+            return text, confidence_level, None, escalated
         
-        return ocr_text, confidence_level, None
-        
-    except Exception as e:
-        return None, None, f"ABBYY: Error: {str(e)}"
+        except Exception as e:
+            return None, None, f"ABBYY: Error: {str(e)}", []
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _average(total, count):
+    return total / count if count else 0.0
+
+def parse_abbyy_xml(xml_file, page_text=False):
+    """Stream an ABBYY XML export once and return its text and confidence aggregates.
+
+    Elements are discarded as soon as they are processed, so memory stays flat no
+    matter how many pages the export has. Returns a dict with:
+      text        plain text, one output line per <line>, blank line between pages
+      confidence  average confidence of all characters (0.0 if none are scored)
+      pages       per page: page, confidence, chars, and lines (per line: confidence, chars),
+                  plus the page's text when page_text is true
+    """
+    import xml.etree.ElementTree as ET
+    total_sum, total_count = 0.0, 0
+    page_sum, page_count = 0.0, 0
+    line_sum, line_count = 0.0, 0
+    line_chars = []
+    page_lines, page_texts, pages = [], [], []
+
+    for _, elem in ET.iterparse(xml_file, events=('end',)):
+        name = _local_name(elem.tag)
+        if name == 'char':
+            line_chars.append(elem.text or "")
+            conf = elem.get('confidence')
+            if conf:
+                line_sum += float(conf)
+                line_count += 1
+            elem.clear()
+        elif name == 'line':
+            page_texts.append("".join(line_chars) if line_chars else "".join(elem.itertext()).strip())
+            page_lines.append({"confidence": _average(line_sum, line_count), "chars": line_count})
+            page_sum += line_sum
+            page_count += line_count
+            line_sum, line_count, line_chars = 0.0, 0, []
+            elem.clear()
+        elif name == 'page':
+            pages.append({
+                "page": len(pages) + 1,
+                "confidence": _average(page_sum, page_count),
+                "chars": page_count,
+                "lines": page_lines,
+                "text": "\n".join(page_texts),
+            })
+            total_sum += page_sum
+            total_count += page_count
+            page_sum, page_count, page_lines, page_texts = 0.0, 0, [], []
+            # Drop the finished page's subtree; only an empty <page> stays attached
+            elem.clear()
+
+    text = "\n\n".join(page["text"] if page_text else page.pop("text") for page in pages)
+    return {"text": text, "confidence": _average(total_sum, total_count), "pages": pages}
 
 def parse_confidence_from_xml(xml_file):
     try:
-        import xml.etree.ElementTree as ET
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        
-        # Find all confidence values
-        confidence_values = []
-        for page in root.findall('.//page'):
-            for block in page.findall('.//block'):
-                for par in block.findall('.//par'):
-                    for line in par.findall('.//line'):
-                        for char in line.findall('.//char'):
-                            conf = char.get('confidence')
-                            if conf:
-                                confidence_values.append(float(conf))
-        
-        # Calculate average confidence
-        if confidence_values:
-            return sum(confidence_values) / len(confidence_values)
-        return 0.0
-        
+        return parse_abbyy_xml(xml_file)["confidence"]
     except Exception as e:
         logger.error(f"Error parsing confidence from XML: {e}")
         return 0.0
@@ -122,6 +409,8 @@ def process_file():
         
         if not file_path:
             return jsonify({"error": "No file path provided"}), 400
+        if engine.lower() not in OCR_ENGINES:
+            return jsonify({"error": f"Unsupported OCR engine: {engine}"}), 400
             
         # Convert relative path to absolute if needed
         if not os.path.isabs(file_path):
@@ -133,62 +422,48 @@ def process_file():
         if not os.access(file_path, os.R_OK):
             return jsonify({"error": f"File not readable: {file_path}"}), 403
             
+        # Born-digital PDFs already carry their text; skip the OCR engines entirely
+        if file_path.lower().endswith('.pdf'):
+            layer_text = born_digital_text(file_path)
+            if layer_text is not None:
+                logger.info(f"Using embedded text layer for {file_path}")
+                return jsonify({
+                    "text": layer_text,
+                    "confidence": text_layer_confidence(engine),
+                    "source": "text_layer"
+                })
+            
         if engine.lower() == 'google':
             # Process with Google Vision OCR
             try:
-                # Upload file to GCS
-                gcs_filename = os.path.basename(file_path)
-                if not upload_gcs_file(GCS_BUCKET_NAME, file_path, gcs_filename):
-                    return jsonify({"error": "Failed to upload file to GCS"}), 500
-                    
-                # Run OCR
-                output_prefix = f"ocr_results/{os.path.splitext(gcs_filename)[0]}"
-                if not async_ocr_pdf(GCS_BUCKET_NAME, gcs_filename, output_prefix):
-                    return jsonify({"error": "Failed to process OCR"}), 500
-                    
-                # Download results
-                local_output_dir = os.path.join(UPLOAD_FOLDER, "ocr_results")
-                if not download_gcs_results(GCS_BUCKET_NAME, output_prefix, local_output_dir):
-                    return jsonify({"error": "Failed to download OCR results"}), 500
-                    
-                # Parse results
-                output_text_file = os.path.join(UPLOAD_FOLDER, f"{os.path.splitext(gcs_filename)[0]}_google_ocr.txt")
-                json_file = os.path.join(local_output_dir, f"{os.path.splitext(gcs_filename)[0]}-output-1-to-1.json")
-                if not parse_ocr_results(json_file, output_text_file):
-                    return jsonify({"error": "Failed to parse OCR results"}), 500
-                    
-                # Read OCR text
-                with open(output_text_file, 'r', encoding='utf-8') as f:
-                    ocr_text = f.read()
-                    
-                # Clean up
-                delete_gcs_file(GCS_BUCKET_NAME, gcs_filename)
-                delete_gcs_results(GCS_BUCKET_NAME, output_prefix)
-                os.remove(output_text_file)
-                os.remove(json_file)
+                result = google_ocr_batch([file_path])[0]
+                if result["error"]:
+                    return jsonify({"error": result["error"]}), 500
                 
-                return jsonify({
-                    "text": ocr_text,
+                response = {
+                    "text": result["text"],
                     "confidence": 1.0  # Google Vision doesn't provide confidence scores
-                })
+                }
+                if result["cached"]:
+                    response["cached"] = True
+                return jsonify(response)
                 
             except Exception as e:
                 logger.error(f"Google Vision OCR error: {e}")
                 return jsonify({"error": f"Google Vision OCR error: {str(e)}"}), 500
                 
-        elif engine.lower() == 'abbyy':
+        else:
             # Process with ABBYY OCR
-            ocr_text, confidence, error = run_abbyy_ocr(file_path)
-            if error:
-                return jsonify({"error": error}), 500
+            result = get_abbyy_executor().submit(abbyy_ocr_result, file_path, data.get('abbyy_mode')).result()
+            if result["error"]:
+                return jsonify({"error": result["error"]}), 500
             return jsonify({
-                "text": ocr_text,
-                "confidence": confidence
+                "text": result["text"],
+                "confidence": result["confidence"],
+                "abbyy_mode": result["mode"],
+                "escalated_pages": result["escalated_pages"]
             })
             
-        else:
-            return jsonify({"error": f"Unsupported OCR engine: {engine}"}), 400
-            
     except Exception as e:
         logger.error(f"Error processing file: {e}")
         return jsonify({"error": str(e)}), 500
@@ -202,37 +477,95 @@ def process_batch():
     if not file_paths:
         return jsonify({'success': False, 'error': 'No files provided'}), 400
         
-    results = []
-    for file_path in file_paths:
+    started = time.monotonic()
+    # Results are filled in by input position, so they come back in input order
+    # however the ABBYY invocations interleave.
+    slots = [None] * len(file_paths)
+    abbyy_indexes, google_indexes = [], []
+    for index, file_path in enumerate(file_paths):
         if not os.path.exists(file_path):
-            results.append({
+            slots[index] = {
                 'file': file_path,
                 'success': False,
                 'error': 'File not found'
-            })
+            }
             continue
-            
-        if engine == "abbyy":
-            text, confidence, error = run_abbyy_ocr(file_path, batch_mode=True)
-            results.append({
-                'file': file_path,
-                'success': error is None,
-                'text': text,
-                'confidence': confidence,
-                'error': error
-            })
-        else:
-            results.append({
+        if engine not in OCR_ENGINES:
+            slots[index] = {
                 'file': file_path,
                 'success': False,
                 'error': f'Unsupported engine for batch: {engine}'
-            })
+            }
+            continue
+            
+        if file_path.lower().endswith('.pdf'):
+            layer_text = born_digital_text(file_path)
+            if layer_text is not None:
+                slots[index] = {
+                    'file': file_path,
+                    'success': True,
+                    'text': layer_text,
+                    'confidence': text_layer_confidence(engine),
+                    'source': 'text_layer',
+                    'error': None,
+                    'elapsed': 0.0
+                }
+                continue
+            
+        if engine == "abbyy":
+            abbyy_indexes.append(index)
+        else:
+            google_indexes.append(index)
+            
+    # Split the ABBYY files into at most ABBYY_BATCH_SIZE-file invocations, spread
+    # over the pool so every licensed core gets work.
+    chunk_size = min(ABBYY_BATCH_SIZE, max(1, -(-len(abbyy_indexes) // ABBYY_WORKERS)))
+    chunks = [abbyy_indexes[i:i + chunk_size] for i in range(0, len(abbyy_indexes), chunk_size)]
+    futures = [
+        get_abbyy_executor().submit(abbyy_ocr_batch, [file_paths[i] for i in chunk], data.get('abbyy_mode'))
+        for chunk in chunks
+    ]
+    if google_indexes:
+        google_started = time.monotonic()
+        google_results = google_ocr_batch([file_paths[i] for i in google_indexes])
+        elapsed = round((time.monotonic() - google_started) / len(google_indexes), 3)
+        for index, result in zip(google_indexes, google_results):
+            slots[index] = {
+                'file': file_paths[index],
+                'success': result['error'] is None,
+                'text': result['text'],
+                'confidence': 1.0 if result['error'] is None else None,
+                'error': result['error'],
+                'cached': result['cached'],
+                'elapsed': elapsed
+            }
+    for chunk, future in zip(chunks, futures):
+        for index, result in zip(chunk, future.result()):
+            slots[index] = {
+                'file': file_paths[index],
+                'success': result['error'] is None,
+                'text': result['text'],
+                'confidence': result['confidence'],
+                'error': result['error'],
+                'abbyy_mode': result['mode'],
+                'escalated_pages': result['escalated_pages'],
+                'elapsed': result['elapsed']
+            }
             
     return jsonify({
         'success': True,
-        'results': results
+        'results': slots,
+        'elapsed': round(time.monotonic() - started, 3)
     })
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(ocr_cache.stats())
+
+@app.route('/api/cleanup/stats', methods=['GET'])
+def cleanup_stats():
+    return jsonify(gcs_cleanup.stats())
+
 def processFile(self, file_path, engine="abbyy"):
     """Process a file using the specified OCR engine"""
     try:
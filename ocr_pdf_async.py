@@ -1,9 +1,17 @@
-import time
-from google.cloud import storage, vision_v1
-from google.cloud.vision_v1 import types
+import io
+import re
+import glob
+import uuid
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from google.cloud import vision_v1
 import json
 import os
 import logging
+from backend.gcs_clients import get_bucket, get_vision_client, bucket_exists
+from backend import scratch, gcs_cleanup
+from vision_operations import get_operation_manager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,12 +20,45 @@ logger = logging.getLogger(__name__)
 # Set the environment variable for the service account key file
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.join(os.path.dirname(__file__), "gil", "ocr-service-account.json")
 
+# Pages per Vision output JSON (the API allows up to 100). Larger shards mean
+# fewer objects to list, download and delete per document.
+VISION_BATCH_SIZE = min(100, max(1, int(os.environ.get("VISION_BATCH_SIZE", "20"))))
+
+# Output shards fetched at once per document.
+VISION_DOWNLOAD_WORKERS = max(1, int(os.environ.get("VISION_DOWNLOAD_WORKERS", "8")))
+
+# Inline (synchronous) Vision requests: images always go through
+# batch_annotate_images, up to the API's 16 images per call; PDFs of at most 5
+# pages and VISION_INLINE_MAX_BYTES through batch_annotate_files. Larger PDFs
+# take the GCS + async route, which only accepts PDF, TIFF and GIF.
+VISION_INLINE_MAX_BYTES = int(os.environ.get("VISION_INLINE_MAX_BYTES", str(10 * 1024 * 1024)))
+VISION_IMAGES_PER_REQUEST = 16
+# Vision's limit per image; larger images are downscaled to a JPEG under it.
+VISION_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+# Total image bytes sent in one batch_annotate_images call.
+VISION_REQUEST_MAX_BYTES = int(os.environ.get("VISION_REQUEST_MAX_BYTES", str(20 * 1024 * 1024)))
+VISION_INLINE_MAX_PAGES = 5
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')
+
+# PDFs longer than this are split into chunks of this many pages that Vision
+# recognizes concurrently (0 disables splitting).
+VISION_CHUNK_PAGES = max(0, int(os.environ.get("VISION_CHUNK_PAGES", "50")))
+
+# Google batches run as an upload -> recognize -> download pipeline. Uploads and
+# downloads run on process-wide thread pools of these sizes; recognition holds no
+# thread and is limited by the operation manager (VISION_MAX_IN_FLIGHT).
+VISION_PIPELINE_UPLOADERS = max(1, int(os.environ.get("VISION_PIPELINE_UPLOADERS", "4")))
+VISION_PIPELINE_FETCHERS = max(1, int(os.environ.get("VISION_PIPELINE_FETCHERS", "4")))
+
+_stage_executors = {}
+_stage_lock = threading.Lock()
+
+_SHARD_RE = re.compile(r"output-(\d+)-to-(\d+)\.json$")
+
 def check_bucket_exists(bucket_name):
-    """Check if the GCS bucket exists and is accessible."""
+    """Check if the GCS bucket exists and is accessible (cached after the first success)."""
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        return bucket.exists()
+        return bucket_exists(bucket_name)
     except Exception as e:
         logger.error(f"Error checking bucket existence: {e}")
         return False
@@ -29,8 +70,7 @@ def upload_gcs_file(bucket_name, source_file_path, destination_blob_name):
             logger.error(f"Bucket {bucket_name} does not exist or is not accessible")
             return False
 
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name)
         blob = bucket.blob(destination_blob_name)
         
         # Check if source file exists and is readable
@@ -48,93 +88,353 @@ def upload_gcs_file(bucket_name, source_file_path, destination_blob_name):
         logger.error(f"Error uploading file: {e}")
         return False
 
-def async_ocr_pdf(bucket_name, source_blob_name, output_prefix):
-    """Run async OCR on a PDF file in GCS."""
+def build_ocr_request(bucket_name, source_blob_name, output_prefix, batch_size=None):
+    """AsyncAnnotateFileRequest for a file in GCS, writing batch_size pages per output JSON."""
+    gcs_source_uri = f"gs://{bucket_name}/{source_blob_name}"
+    gcs_destination_uri = f"gs://{bucket_name}/{output_prefix}/"
+
+    ext = os.path.splitext(source_blob_name)[1].lower()
+    mime_type = {".pdf": "application/pdf", ".gif": "image/gif"}.get(ext, "image/tiff")
+    feature = vision_v1.Feature(type_=vision_v1.Feature.Type.DOCUMENT_TEXT_DETECTION)
+    gcs_source = vision_v1.GcsSource(uri=gcs_source_uri)
+    input_config = vision_v1.InputConfig(gcs_source=gcs_source, mime_type=mime_type)
+    gcs_destination = vision_v1.GcsDestination(uri=gcs_destination_uri)
+    output_config = vision_v1.OutputConfig(
+        gcs_destination=gcs_destination, batch_size=batch_size or VISION_BATCH_SIZE
+    )
+    return vision_v1.AsyncAnnotateFileRequest(
+        features=[feature], input_config=input_config, output_config=output_config
+    )
+
+def submit_ocr_pdf(bucket_name, source_blob_name, output_prefix, batch_size=None):
+    """Start async OCR on a file in GCS without blocking; returns a Future (see vision_operations)."""
+    request = build_ocr_request(bucket_name, source_blob_name, output_prefix, batch_size)
+    return get_operation_manager().submit(request)
+
+def shard_page_range(name):
+    """(first_page, last_page) of a Vision output shard named like output-3-to-4.json, or None."""
+    match = _SHARD_RE.search(name)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+def shard_page_texts(shard, first_page=1):
+    """List (page_number, text) for every page response in a parsed output shard."""
+    pages = []
+    for index, response in enumerate(shard.get('responses', [])):
+        page_number = response.get('context', {}).get('pageNumber', first_page + index)
+        pages.append((page_number, response.get('fullTextAnnotation', {}).get('text', '')))
+    return pages
+
+def assemble_ocr_text(shards):
+    """Join the pages of parsed output shards, given as (first_page, shard) pairs, in page order."""
+    pages = []
+    for first_page, shard in shards:
+        pages.extend(shard_page_texts(shard, first_page))
+    pages.sort(key=lambda page: page[0])
+    return _join_pages(text for _, text in pages)
+
+def _join_pages(texts):
+    return "\n\n".join(text.rstrip("\n") for text in texts)
+
+def _download_shard(blob):
+    return shard_page_range(blob.name)[0], json.loads(blob.download_as_bytes())
+
+def fetch_ocr_text(bucket_name, output_prefix, workers=None):
+    """Fetch every output shard under output_prefix in parallel, in memory, and return
+    the assembled text in page order, or None on failure."""
     try:
-        client = vision_v1.ImageAnnotatorClient()
-        gcs_source_uri = f"gs://{bucket_name}/{source_blob_name}"
-        gcs_destination_uri = f"gs://{bucket_name}/{output_prefix}/"
-
-        mime_type = "application/pdf" if source_blob_name.lower().endswith(".pdf") else "image/tiff"
-        feature = vision_v1.Feature(type_=vision_v1.Feature.Type.DOCUMENT_TEXT_DETECTION)
-        gcs_source = vision_v1.GcsSource(uri=gcs_source_uri)
-        input_config = vision_v1.InputConfig(gcs_source=gcs_source, mime_type=mime_type)
-        gcs_destination = vision_v1.GcsDestination(uri=gcs_destination_uri)
-        output_config = vision_v1.OutputConfig(gcs_destination=gcs_destination, batch_size=1)
-        async_request = vision_v1.AsyncAnnotateFileRequest(
-            features=[feature], input_config=input_config, output_config=output_config
-        )
-        operation = client.async_batch_annotate_files(requests=[async_request])
-        logger.info("Processing OCR... (this may take a while)")
-        operation.result(timeout=600)
-        logger.info("OCR processing complete.")
-        return True
+        bucket = get_bucket(bucket_name)
+        blobs = [blob for blob in bucket.list_blobs(prefix=output_prefix) if shard_page_range(blob.name)]
+        if not blobs:
+            logger.error(f"No OCR output shards under gs://{bucket_name}/{output_prefix}")
+            return None
+        with ThreadPoolExecutor(max_workers=min(workers or VISION_DOWNLOAD_WORKERS, len(blobs))) as executor:
+            shards = list(executor.map(_download_shard, blobs))
+        logger.info(f"Fetched {len(shards)} OCR output shards from gs://{bucket_name}/{output_prefix}")
+        return assemble_ocr_text(shards)
     except Exception as e:
-        logger.error(f"Error running OCR: {e}")
-        return False
+        logger.error(f"Error fetching OCR results: {e}")
+        return None
+
+def split_pdf(pdf_path, chunk_pages, out_dir):
+    """Split a PDF into files of chunk_pages pages in out_dir.
 
-def download_gcs_results(bucket_name, output_prefix, local_output_dir):
-    """Download OCR results from GCS."""
+    Returns the chunk paths in page order, or None if poppler can't split it.
+    """
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        blobs = bucket.list_blobs(prefix=output_prefix)
-        
-        os.makedirs(local_output_dir, exist_ok=True)
-        
-        for blob in blobs:
-            if blob.name.endswith('.json'):
-                local_path = os.path.join(local_output_dir, os.path.basename(blob.name))
-                blob.download_to_filename(local_path)
-                logger.info(f"Downloaded {blob.name} to {local_path}")
-        return True
-    except Exception as e:
-        logger.error(f"Error downloading results: {e}")
-        return False
+        subprocess.run(
+            ["pdfseparate", pdf_path, os.path.join(out_dir, "page-%d.pdf")],
+            check=True, capture_output=True, timeout=300
+        )
+        pages = sorted(
+            glob.glob(os.path.join(out_dir, "page-*.pdf")),
+            key=lambda path: int(re.search(r"page-(\d+)\.pdf$", path).group(1))
+        )
+        chunks = []
+        for start in range(0, len(pages), chunk_pages):
+            chunk = os.path.join(out_dir, f"{stem}-part{len(chunks) + 1:03d}.pdf")
+            subprocess.run(["pdfunite", *pages[start:start + chunk_pages], chunk],
+                           check=True, capture_output=True, timeout=300)
+            chunks.append(chunk)
+        return chunks
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not split {pdf_path} into chunks: {e}")
+        return None
+
+def google_ocr_documents(bucket_name, file_paths):
+    """OCR local files with Vision through GCS; return (text, error) for each, in order.
 
-def parse_ocr_results(json_file_path, output_text_file):
-    """Parse OCR results from JSON file and save to text file."""
+    Documents flow through upload, recognize and download stages at once, so one
+    file uploads while another is recognized and a third is downloaded. PDFs
+    longer than VISION_CHUNK_PAGES are split into page-range chunks that are
+    uploaded and recognized concurrently, then merged in order.
+    """
+    jobs = [{"file_path": file_path, "error": None, "text": None} for file_path in file_paths]
+    if len(jobs) == 1:
+        # Nothing to overlap: run the stages in the calling thread.
+        job = jobs[0]
+        _run_stage(_upload_document, bucket_name, job)
+        recognized = threading.Event()
+        _recognize_document(bucket_name, job, lambda job: recognized.set())
+        recognized.wait()
+        _run_stage(_fetch_document, bucket_name, job)
+    else:
+        wait([_process_document(bucket_name, job) for job in jobs])
+    return [(job["text"], job["error"]) for job in jobs]
+
+def _stage_executor(name, workers):
+    with _stage_lock:
+        executor = _stage_executors.get(name)
+        if executor is None:
+            executor = _stage_executors[name] = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=f"vision-{name}"
+            )
+        return executor
+
+def _run_stage(stage, bucket_name, job):
+    """Run stage(bucket_name, job), recording an exception in job["error"]."""
     try:
-        with open(json_file_path, 'r') as f:
-            response = json.load(f)
-        
-        text = ""
-        if 'fullTextAnnotation' in response:
-            text = response['fullTextAnnotation'].get('text', '')
-        
-        with open(output_text_file, 'w', encoding='utf-8') as f:
-            f.write(text)
-        
-        logger.info(f"Saved OCR text to {output_text_file}")
-        return True
+        stage(bucket_name, job)
     except Exception as e:
-        logger.error(f"Error parsing OCR results: {e}")
-        return False
+        logger.error(f"Vision {stage.__name__} failed: {e}")
+        job["error"] = job["error"] or f"Google Vision OCR error: {str(e)}"
+
+def _process_document(bucket_name, job):
+    """Chain a document through the stages; return a Future that resolves once it is downloaded."""
+    finished = Future()
+
+    def fetch(job):
+        fetching = _stage_executor("fetch", VISION_PIPELINE_FETCHERS).submit(
+            _run_stage, _fetch_document, bucket_name, job
+        )
+        fetching.add_done_callback(lambda _: finished.set_result(job))
+
+    uploading = _stage_executor("upload", VISION_PIPELINE_UPLOADERS).submit(
+        _run_stage, _upload_document, bucket_name, job
+    )
+    uploading.add_done_callback(lambda _: _recognize_document(bucket_name, job, fetch))
+    return finished
 
-def delete_gcs_file(bucket_name, blob_name):
-    """Delete a file from GCS bucket."""
+def _upload_document(bucket_name, job):
+    """Upload stage: split long PDFs into chunks and upload every part under a unique prefix."""
+    job["token"] = token = uuid.uuid4().hex
+    file_path = job["file_path"]
+    with scratch.workspace("vision") as work_dir:
+        parts = [file_path]
+        if VISION_CHUNK_PAGES and file_path.lower().endswith(".pdf"):
+            page_count = _pdf_page_count(file_path)
+            if page_count and page_count > VISION_CHUNK_PAGES:
+                chunks = split_pdf(file_path, VISION_CHUNK_PAGES, work_dir)
+                if chunks:
+                    logger.info(f"Split {page_count}-page {file_path} into {len(chunks)} chunks")
+                    parts = chunks
+        job["blob_names"] = [f"{token}/{os.path.basename(part)}" for part in parts]
+        with ThreadPoolExecutor(max_workers=min(VISION_DOWNLOAD_WORKERS, len(parts))) as executor:
+            uploaded = list(executor.map(
+                lambda pair: upload_gcs_file(bucket_name, *pair), zip(parts, job["blob_names"])
+            ))
+    if not all(uploaded):
+        job["error"] = "Failed to upload file to GCS"
+
+def _recognize_document(bucket_name, job, on_done):
+    """Recognize stage: submit every part to Vision and call on_done(job) once all have finished.
+
+    No thread waits on Vision; the operation manager's futures trigger on_done.
+    Every part is waited for, even after a failure, so no operation is still
+    writing output when the download stage queues the document's prefixes for deletion.
+    """
+    if job["error"]:
+        on_done(job)
+        return
+    job["output_prefixes"] = [f"ocr_results/{os.path.splitext(name)[0]}" for name in job["blob_names"]]
+    futures = []
+    for blob_name, output_prefix in zip(job["blob_names"], job["output_prefixes"]):
+        try:
+            futures.append(submit_ocr_pdf(bucket_name, blob_name, output_prefix))
+        except Exception as e:
+            failed = Future()
+            failed.set_exception(e)
+            futures.append(failed)
+    logger.info(f"Processing OCR of {job['file_path']} in {len(futures)} part(s)... (this may take a while)")
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def part_done(future):
+        if future.exception() is not None:
+            logger.error(f"Error running OCR: {future.exception()}")
+            job["error"] = "Failed to process OCR"
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            on_done(job)
+
+    if not futures:
+        on_done(job)
+    for future in futures:
+        future.add_done_callback(part_done)
+
+def _fetch_document(bucket_name, job):
+    """Download stage: fetch and merge every part's text, then queue the document's objects for deletion."""
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(blob_name)
-        blob.delete()
-        logger.info(f"Deleted {blob_name} from bucket {bucket_name}")
-        return True
-    except Exception as e:
-        logger.error(f"Error deleting file: {e}")
-        return False
+        if job["error"]:
+            return
+        with ThreadPoolExecutor(max_workers=min(VISION_DOWNLOAD_WORKERS, len(job["output_prefixes"]))) as executor:
+            texts = list(executor.map(lambda prefix: fetch_ocr_text(bucket_name, prefix), job["output_prefixes"]))
+        if any(text is None for text in texts):
+            job["error"] = "Failed to download OCR results"
+            return
+        job["text"] = _join_pages(texts)
+    finally:
+        if job.get("token"):
+            gcs_cleanup.schedule_delete(bucket_name, prefix=f"{job['token']}/")
+            gcs_cleanup.schedule_delete(bucket_name, prefix=f"ocr_results/{job['token']}/")
+
+def _document_text_feature():
+    return vision_v1.Feature(type_=vision_v1.Feature.Type.DOCUMENT_TEXT_DETECTION)
 
-def delete_gcs_results(bucket_name, output_prefix):
-    """Delete all OCR result files from GCS bucket."""
+def _pdf_page_count(pdf_path):
+    """Page count from poppler's pdfinfo, or None if it can't be determined."""
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        blobs = bucket.list_blobs(prefix=output_prefix)
-        
-        for blob in blobs:
-            blob.delete()
-            logger.info(f"Deleted {blob.name} from bucket {bucket_name}")
-        return True
+        result = subprocess.run(["pdfinfo", pdf_path], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r"^Pages:\s+(\d+)", result.stdout, re.MULTILINE)
+    return int(match.group(1)) if match else None
+
+def inline_kind(file_path):
+    """How a file can be sent to Vision without GCS: "image", "pdf", or None (use GCS)."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return "image"
+    if os.path.getsize(file_path) > VISION_INLINE_MAX_BYTES:
+        return None
+    if ext == ".pdf":
+        page_count = _pdf_page_count(file_path)
+        if page_count is not None and page_count <= VISION_INLINE_MAX_PAGES:
+            return "pdf"
+    return None
+
+def image_groups(image_paths):
+    """Split image_paths into request-sized groups.
+
+    A group holds at most VISION_IMAGES_PER_REQUEST images totalling at most
+    VISION_REQUEST_MAX_BYTES, except that an image bigger than that goes alone.
+    """
+    groups, group, group_bytes = [], [], 0
+    for image_path in image_paths:
+        size = os.path.getsize(image_path)
+        if group and (len(group) == VISION_IMAGES_PER_REQUEST or group_bytes + size > VISION_REQUEST_MAX_BYTES):
+            groups.append(group)
+            group, group_bytes = [], 0
+        group.append(image_path)
+        group_bytes += size
+    if group:
+        groups.append(group)
+    return groups
+
+def image_content(image_path):
+    """The bytes to send for an image: the file itself, or a downscaled JPEG if it exceeds VISION_IMAGE_MAX_BYTES."""
+    with open(image_path, 'rb') as f:
+        content = f.read()
+    if len(content) <= VISION_IMAGE_MAX_BYTES:
+        return content
+    from PIL import Image
+    with Image.open(io.BytesIO(content)) as opened:
+        image = opened.convert("RGB") if opened.mode not in ("RGB", "L") else opened.copy()
+    scale = 1.0
+    while True:
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        buffer = io.BytesIO()
+        (image if scale == 1.0 else image.resize(size)).save(buffer, "JPEG", quality=90)
+        if buffer.tell() <= VISION_IMAGE_MAX_BYTES:
+            logger.info(f"Downscaled {image_path} from {len(content)} to {buffer.tell()} bytes for Vision")
+            return buffer.getvalue()
+        scale *= 0.7
+
+def vision_ocr_images(image_paths):
+    """OCR images inline with batch_annotate_images, one call per image_groups() group.
+
+    Returns (text, error) for each image, in order.
+    """
+    if not image_paths:
+        return []
+    client = get_vision_client()
+    results = []
+    for group in image_groups(image_paths):
+        try:
+            image_requests = []
+            for image_path in group:
+                image_requests.append(vision_v1.AnnotateImageRequest(
+                    image=vision_v1.Image(content=image_content(image_path)), features=[_document_text_feature()]
+                ))
+            response = client.batch_annotate_images(requests=image_requests)
+            for image_response in response.responses:
+                if image_response.error.message:
+                    results.append((None, f"Vision error: {image_response.error.message}"))
+                else:
+                    results.append((image_response.full_text_annotation.text, None))
+            logger.info(f"OCR'd {len(group)} images inline")
+        except Exception as e:
+            logger.error(f"Error running inline image OCR: {e}")
+            results.extend((None, f"Vision error: {str(e)}") for _ in group)
+    return results
+
+def vision_ocr_small_pdf(pdf_path):
+    """OCR a PDF of up to VISION_INLINE_MAX_PAGES pages inline; return (text, error)."""
+    try:
+        with open(pdf_path, 'rb') as f:
+            input_config = vision_v1.InputConfig(content=f.read(), mime_type="application/pdf")
+        # Without `pages` the API reads the first 5 pages, i.e. all of a small PDF.
+        request = vision_v1.AnnotateFileRequest(input_config=input_config, features=[_document_text_feature()])
+        file_response = get_vision_client().batch_annotate_files(requests=[request]).responses[0]
+        if file_response.error.message:
+            return None, f"Vision error: {file_response.error.message}"
+        for page_response in file_response.responses:
+            if page_response.error.message:
+                return None, f"Vision error: {page_response.error.message}"
+        return _join_pages(page.full_text_annotation.text for page in file_response.responses), None
     except Exception as e:
-        logger.error(f"Error deleting results: {e}")
-        return False
+        logger.error(f"Error running inline PDF OCR: {e}")
+        return None, f"Vision error: {str(e)}"
+
+def google_ocr_files(bucket_name, file_paths):
+    """OCR several local files with Vision; return (text, error) for each, in order.
+
+    Images and small PDFs are sent inline (images batched together); only
+    large documents are uploaded to GCS for async recognition.
+    """
+    kinds = [inline_kind(file_path) for file_path in file_paths]
+    results = [None] * len(file_paths)
+    image_indexes = [i for i, kind in enumerate(kinds) if kind == "image"]
+    for i, result in zip(image_indexes, vision_ocr_images([file_paths[i] for i in image_indexes])):
+        results[i] = result
+    for i, file_path in enumerate(file_paths):
+        if kinds[i] == "pdf":
+            results[i] = vision_ocr_small_pdf(file_path)
+    gcs_indexes = [i for i, kind in enumerate(kinds) if kind is None]
+    if gcs_indexes:
+        documents = google_ocr_documents(bucket_name, [file_paths[i] for i in gcs_indexes])
+        for i, result in zip(gcs_indexes, documents):
+            results[i] = result
+    return results
@@ -0,0 +1,60 @@
+"""Benchmark: one CLI process per file against a resident engine worker.
+
+Usage: python scripts/benchmark_abbyy_worker.py [--files 10] [--startup 2.0]
+    [--cli path/to/CommandLineInterface] [--worker "worker command"]
+
+Defaults to the stand-in scripts, whose --startup delay imitates FREngine loading.
+Reports total and per-file wall time for each mode.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+os.environ["OCR_CACHE_ENABLED"] = "0"
+
+import main
+import abbyy_worker
+
+def measure(label, paths):
+    started = time.monotonic()
+    for path in paths:
+        _, _, error = main.run_abbyy_ocr(path)
+        if error:
+            raise SystemExit(f"{label}: {error}")
+    elapsed = time.monotonic() - started
+    print(f"{label:<8} {elapsed:7.2f}s total  {elapsed / len(paths):6.2f}s per file")
+
+def run():
+    parser = argparse.ArgumentParser(description="ABBYY CLI vs resident worker benchmark")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--startup", type=float, default=2.0, help="Simulated engine load time (stand-ins only)")
+    parser.add_argument("--cli", default=os.path.join(ROOT_DIR, "scripts", "fake_abbyy_cli.py"))
+    parser.add_argument("--worker", default=os.path.join(ROOT_DIR, "scripts", "fake_abbyy_worker.py"))
+    args = parser.parse_args()
+    os.environ["FAKE_ABBYY_STARTUP_SECONDS"] = str(args.startup)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp_dir, f"doc{i}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"Document {i}\nשלום עולם")
+            paths.append(path)
+
+        main.ABBYY_CLI_PATH = args.cli
+        abbyy_worker.ABBYY_WORKER_CMD = ""
+        measure("cli", paths)
+
+        abbyy_worker.ABBYY_WORKER_CMD = args.worker
+        try:
+            measure("worker", paths)
+        finally:
+            abbyy_worker.stop_workers()
+
+if __name__ == "__main__":
+    run()
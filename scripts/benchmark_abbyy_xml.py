@@ -0,0 +1,80 @@
+"""Micro-benchmark: streaming parse_abbyy_xml against the previous ET.parse/findall
+confidence extraction, on a synthetic ABBYY XML export.
+
+Usage: python scripts/benchmark_abbyy_xml.py [--pages 200] [--lines 40] [--chars 60] [--xml existing.xml]
+Reports wall time and peak Python heap (tracemalloc) for each parser.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import parse_abbyy_xml
+
+def legacy_parse_confidence_from_xml(xml_file):
+    """The original implementation: whole tree in memory, one float per character."""
+    tree = ET.parse(xml_file)
+    root = tree.getroot()
+    confidence_values = []
+    for page in root.findall('.//page'):
+        for block in page.findall('.//block'):
+            for par in block.findall('.//par'):
+                for line in par.findall('.//line'):
+                    for char in line.findall('.//char'):
+                        conf = char.get('confidence')
+                        if conf:
+                            confidence_values.append(float(conf))
+    if confidence_values:
+        return sum(confidence_values) / len(confidence_values)
+    return 0.0
+
+def write_sample_xml(path, pages, lines, chars):
+    line_xml = "<line>" + "".join(
+        f'<char confidence="{60 + (i * 7) % 40}">{"אבגדהוזחטabcdefghi"[i % 18]}</char>' for i in range(chars)
+    ) + "</line>"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<document>\n')
+        for _ in range(pages):
+            f.write("<page><block><par>")
+            for _ in range(lines):
+                f.write(line_xml)
+            f.write("</par></block></page>\n")
+        f.write("</document>\n")
+
+def measure(label, fn, xml_path):
+    start = time.perf_counter()
+    result = fn(xml_path)
+    elapsed = time.perf_counter() - start
+    # Separate run for memory, since tracing slows the parsers down
+    tracemalloc.start()
+    fn(xml_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed:7.2f}s  peak {peak / 1024 / 1024:8.1f} MB")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="ABBYY XML confidence parser benchmark")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=40)
+    parser.add_argument("--chars", type=int, default=60)
+    parser.add_argument("--xml", help="Use an existing ABBYY XML export instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        xml_path = args.xml
+        if not xml_path:
+            xml_path = os.path.join(tmp_dir, "sample.xml")
+            write_sample_xml(xml_path, args.pages, args.lines, args.chars)
+        print(f"{xml_path}: {os.path.getsize(xml_path) / 1024 / 1024:.1f} MB")
+        legacy = measure("legacy", legacy_parse_confidence_from_xml, xml_path)
+        streaming = measure("streaming", parse_abbyy_xml, xml_path)
+        print(f"confidence legacy={legacy:.4f} streaming={streaming['confidence']:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Stand-in for the ABBYY FineReader Engine CommandLineInterface sample.
+
+Accepts the same flags main.py passes to the real binary and writes output in
+the same shape, so the ABBYY code paths can be exercised and timed without the
+SDK or a licence:
+
+    ABBYY_CLI_PATH=scripts/fake_abbyy_cli.py python main.py
+
+Recognized text comes from the input file itself when it is a .txt file (pages
+separated by form feeds), otherwise from FAKE_ABBYY_TEXT or a built-in sample.
+Several "-if <input> -of <output>" pairs may be given to recognize a batch of
+files with one engine start-up.
+
+Environment:
+    FAKE_ABBYY_TEXT             text to "recognize" for non-.txt inputs
+    FAKE_ABBYY_CONFIDENCE       per-character confidence to report (default 90)
+    FAKE_ABBYY_FAST_CONFIDENCE  confidence of non-ASCII (e.g. Hebrew) characters in
+                                Fast mode, which handles them worse (default 60)
+    FAKE_ABBYY_STARTUP_SECONDS  delay imitating engine initialisation (default 0)
+    FAKE_ABBYY_CALL_LOG         append one JSON line per invocation to this file
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from xml.sax.saxutils import escape
+
+SAMPLE_TEXT = "שלום עולם\nHello World"
+
+def recognized_pages(input_path):
+    if input_path.lower().endswith(".txt"):
+        with open(input_path, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = os.environ.get("FAKE_ABBYY_TEXT", SAMPLE_TEXT)
+    return text.split("\f")
+
+def char_confidence(c, confidence, mode):
+    if mode == "Fast" and not c.isascii():
+        return int(os.environ.get("FAKE_ABBYY_FAST_CONFIDENCE", "60"))
+    return confidence
+
+def to_xml(pages, confidence, mode="Accurate"):
+    out = ['<?xml version="1.0" encoding="UTF-8"?>', "<document>"]
+    for page_text in pages:
+        out.append("<page><block><par>")
+        for line in page_text.splitlines():
+            chars = "".join(
+                f'<char confidence="{char_confidence(c, confidence, mode)}">{escape(c)}</char>' for c in line
+            )
+            out.append(f"<line>{chars}</line>")
+        out.append("</par></block></page>")
+    out.append("</document>")
+    return "\n".join(out)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake ABBYY CommandLineInterface")
+    parser.add_argument("-if", dest="inputs", action="append", required=True)
+    parser.add_argument("-of", dest="outputs", action="append", required=True)
+    parser.add_argument("-f", dest="format", default="Text")
+    parser.add_argument("-rm", dest="mode", default="Balanced")
+    args = parser.parse_args()
+    if len(args.inputs) != len(args.outputs):
+        parser.error("every -if needs a matching -of")
+
+    call_log = os.environ.get("FAKE_ABBYY_CALL_LOG")
+    if call_log:
+        with open(call_log, "a") as f:
+            f.write(json.dumps(sys.argv[1:]) + "\n")
+
+    time.sleep(float(os.environ.get("FAKE_ABBYY_STARTUP_SECONDS", "0")))
+    confidence = int(os.environ.get("FAKE_ABBYY_CONFIDENCE", "90"))
+    status = 0
+    # Like a multi-document batch: a failing input is reported but the rest still run
+    for input_path, output_path in zip(args.inputs, args.outputs):
+        if not os.path.exists(input_path):
+            print(f"Cannot open input file {input_path}", file=sys.stderr)
+            status = 1
+            continue
+        pages = recognized_pages(input_path)
+        with open(output_path, "w", encoding="utf-8") as f:
+            if args.format == "XML":
+                f.write(to_xml(pages, confidence, args.mode))
+            else:
+                f.write("\n\n".join(pages))
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
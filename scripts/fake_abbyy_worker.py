@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Stand-in for a resident ABBYY engine worker (see abbyy_worker.py).
+
+Pays the simulated engine start-up once, then serves recognition jobs from
+stdin using the same output as fake_abbyy_cli.py:
+
+    ABBYY_WORKER_CMD=scripts/fake_abbyy_worker.py python main.py
+
+Environment (as for fake_abbyy_cli.py, plus):
+    FAKE_ABBYY_CRASH_AFTER  exit abruptly after serving this many jobs
+"""
+import os
+import sys
+import json
+import time
+
+from fake_abbyy_cli import recognized_pages, to_xml
+
+def recognize(job, confidence):
+    if not os.path.exists(job["input"]):
+        return f"Cannot open input file {job['input']}"
+    pages = recognized_pages(job["input"])
+    with open(job["output"], "w", encoding="utf-8") as f:
+        if job.get("format", "XML") == "XML":
+            f.write(to_xml(pages, confidence, job.get("mode", "Accurate")))
+        else:
+            f.write("\n\n".join(pages))
+    return None
+
+def main():
+    call_log = os.environ.get("FAKE_ABBYY_CALL_LOG")
+    if call_log:
+        with open(call_log, "a") as f:
+            f.write(json.dumps(["worker-start"]) + "\n")
+    time.sleep(float(os.environ.get("FAKE_ABBYY_STARTUP_SECONDS", "0")))
+    confidence = int(os.environ.get("FAKE_ABBYY_CONFIDENCE", "90"))
+    crash_after = int(os.environ.get("FAKE_ABBYY_CRASH_AFTER", "0"))
+    print(json.dumps({"ready": True}), flush=True)
+
+    served = 0
+    for line in sys.stdin:
+        job = json.loads(line)
+        if call_log:
+            with open(call_log, "a") as f:
+                f.write(json.dumps(["-if", job["input"], "-of", job["output"],
+                                    "-f", job.get("format", "XML"), "-rm", job.get("mode", "")]) + "\n")
+        error = recognize(job, confidence)
+        response = {"id": job["id"], "ok": error is None}
+        if error:
+            response["error"] = error
+        print(json.dumps(response, ensure_ascii=False), flush=True)
+        served += 1
+        if crash_after and served >= crash_after:
+            os._exit(1)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
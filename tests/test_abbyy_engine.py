@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import main
+import abbyy_worker
+from backend import ocr_cache, scratch
+
+FAKE_CLI = os.path.join(ROOT_DIR, "scripts", "fake_abbyy_cli.py")
+FAKE_WORKER = os.path.join(ROOT_DIR, "scripts", "fake_abbyy_worker.py")
+
+
+def setup_fake_cli(monkeypatch, tmp_path):
+    call_log = tmp_path / "calls.jsonl"
+    monkeypatch.setattr(main, "ABBYY_CLI_PATH", FAKE_CLI)
+    monkeypatch.setattr(scratch, "SCRATCH_ROOT", str(tmp_path / "scratch"))
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_ENABLED", False)
+    monkeypatch.setenv("FAKE_ABBYY_CALL_LOG", str(call_log))
+    monkeypatch.chdir(tmp_path)
+    return call_log
+
+def read_calls(call_log):
+    with open(call_log) as f:
+        return [json.loads(line) for line in f]
+
+def test_single_recognition_pass_returns_text_and_confidence(monkeypatch, tmp_path):
+    call_log = setup_fake_cli(monkeypatch, tmp_path)
+    source = tmp_path / "letter.txt"
+    source.write_text("שלום עולם\nHello World\fPage two", encoding="utf-8")
+
+    text, confidence, error = main.run_abbyy_ocr(str(source))
+
+    assert error is None
+    assert text == "שלום עולם\nHello World\n\nPage two"
+    assert confidence == 90.0
+    calls = read_calls(call_log)
+    assert len(calls) == 1
+    assert calls[0][calls[0].index("-f") + 1] == "XML"
+    assert not list(tmp_path.glob("**/*_abbyy_ocr.*"))
+    assert os.listdir(scratch.process_root()) == []
+
+def test_cli_failure_is_reported(monkeypatch, tmp_path):
+    setup_fake_cli(monkeypatch, tmp_path)
+    monkeypatch.setattr(main, "ABBYY_CLI_PATH", str(tmp_path / "no-such-cli"))
+    source = tmp_path / "letter.txt"
+    source.write_text("Hello", encoding="utf-8")
+    text, confidence, error = main.run_abbyy_ocr(str(source))
+    assert text is None
+    assert error.startswith("ABBYY: Error")
+
+def test_batch_runs_files_concurrently_in_input_order(monkeypatch, tmp_path):
+    call_log = setup_fake_cli(monkeypatch, tmp_path)
+    monkeypatch.setenv("FAKE_ABBYY_STARTUP_SECONDS", "0.5")
+    monkeypatch.setattr(main, "ABBYY_WORKERS", 4)
+    monkeypatch.setattr(main, "_abbyy_executor", ThreadPoolExecutor(max_workers=4))
+    file_paths = []
+    for i in range(4):
+        source = tmp_path / f"doc{i}.txt"
+        source.write_text(f"Document {i}", encoding="utf-8")
+        file_paths.append(str(source))
+    file_paths.insert(2, str(tmp_path / "missing.txt"))
+
+    response = main.app.test_client().post("/api/process_batch", json={"file_paths": file_paths})
+
+    body = response.get_json()
+    assert [r["file"] for r in body["results"]] == file_paths
+    assert [r.get("text") for r in body["results"]] == [
+        "Document 0", "Document 1", None, "Document 2", "Document 3"
+    ]
+    assert all(r["elapsed"] >= 0.5 for r in body["results"] if r["success"])
+    assert body["elapsed"] < 4 * 0.5
+    assert len(read_calls(call_log)) == 4
+
+def test_batch_shares_one_engine_invocation_per_core(monkeypatch, tmp_path):
+    call_log = setup_fake_cli(monkeypatch, tmp_path)
+    monkeypatch.setattr(main, "ABBYY_WORKERS", 2)
+    monkeypatch.setattr(main, "_abbyy_executor", ThreadPoolExecutor(max_workers=2))
+    file_paths = []
+    for i in range(5):
+        source = tmp_path / f"doc{i}.txt"
+        source.write_text(f"Document {i}", encoding="utf-8")
+        file_paths.append(str(source))
+
+    response = main.app.test_client().post("/api/process_batch", json={"file_paths": file_paths})
+
+    body = response.get_json()
+    assert [r["text"] for r in body["results"]] == [f"Document {i}" for i in range(5)]
+    calls = read_calls(call_log)
+    assert sorted(call.count("-if") for call in calls) == [2, 3]
+    assert os.listdir(scratch.process_root()) == []
+
+def test_batch_reruns_files_missing_from_the_batch_output(monkeypatch, tmp_path):
+    call_log = setup_fake_cli(monkeypatch, tmp_path)
+    good = tmp_path / "good.txt"
+    good.write_text("Fine", encoding="utf-8")
+    missing = str(tmp_path / "vanished.txt")
+
+    results = main._run_abbyy_cli_batch([str(good), missing])
+
+    assert results[str(good)] == ("Fine", 90.0, None)
+    assert results[missing][2].startswith("ABBYY: XML generation error")
+    assert [call.count("-if") for call in read_calls(call_log)] == [2, 1]
+
+def test_resident_worker_is_reused_and_restarted_after_a_crash(monkeypatch, tmp_path):
+    call_log = setup_fake_cli(monkeypatch, tmp_path)
+    monkeypatch.setattr(abbyy_worker, "ABBYY_WORKER_CMD", FAKE_WORKER)
+    monkeypatch.setenv("FAKE_ABBYY_CRASH_AFTER", "2")
+    try:
+        for i in range(3):
+            source = tmp_path / f"doc{i}.txt"
+            source.write_text(f"Document {i}", encoding="utf-8")
+            text, confidence, error = main.run_abbyy_ocr(str(source))
+            assert (text, confidence, error) == (f"Document {i}", 90.0, None)
+    finally:
+        abbyy_worker.stop_workers()
+    calls = read_calls(call_log)
+    assert calls.count(["worker-start"]) == 2
+    assert len(calls) == 5
+
+def test_adaptive_mode_escalates_only_low_confidence_pages(monkeypatch, tmp_path):
+    call_log = setup_fake_cli(monkeypatch, tmp_path)
+
+    def text_page_subset(file_path, pages, work_dir):
+        with open(file_path, encoding="utf-8") as f:
+            all_pages = f.read().split("\f")
+        subset = os.path.join(work_dir, "escalated.txt")
+        with open(subset, "w", encoding="utf-8") as f:
+            f.write("\f".join(all_pages[page - 1] for page in pages))
+        return subset
+
+    monkeypatch.setattr(main, "_page_subset", text_page_subset)
+    source = tmp_path / "chart.txt"
+    source.write_text("Typed page\fשלום עולם\fAnother typed page", encoding="utf-8")
+
+    result = main.abbyy_ocr_result(str(source), mode="adaptive")
+
+    assert result["error"] is None
+    assert result["escalated_pages"] == [2]
+    assert result["text"] == "Typed page\n\nשלום עולם\n\nAnother typed page"
+    assert result["confidence"] == 90.0
+    calls = read_calls(call_log)
+    assert [call[call.index("-rm") + 1] for call in calls] == ["Fast", "Accurate"]
+    assert calls[1][calls[1].index("-if") + 1].endswith("escalated.txt")
+
+def test_adaptive_mode_does_not_escalate_blank_pages(monkeypatch, tmp_path):
+    call_log = setup_fake_cli(monkeypatch, tmp_path)
+    source = tmp_path / "bundle.txt"
+    source.write_text("Typed page\f\fAnother typed page", encoding="utf-8")
+
+    result = main.abbyy_ocr_result(str(source), mode="adaptive")
+
+    assert result["error"] is None
+    assert result["escalated_pages"] == []
+    assert result["confidence"] == 90.0
+    assert [call[call.index("-rm") + 1] for call in read_calls(call_log)] == ["Fast"]
+
+def test_adaptive_mode_escalates_text_pages_without_scores(monkeypatch, tmp_path):
+    monkeypatch.setattr(scratch, "SCRATCH_ROOT", str(tmp_path / "scratch"))
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_ENABLED", False)
+    exports = {
+        "Fast": '<document><page><block><par><line><char>a</char><char>b</char></line></par></block></page>'
+                '<page></page>'
+                '<page><block><par><line><char confidence="95">c</char></line></par></block></page></document>',
+        "Accurate": '<document><page><block><par><line><char confidence="95">A</char><char confidence="95">B</char>'
+                    '</line></par></block></page></document>',
+    }
+    passes = []
+
+    def fake_recognize(file_path, output_xml, mode):
+        passes.append((os.path.basename(file_path), mode))
+        with open(output_xml, "w", encoding="utf-8") as f:
+            f.write(exports[mode])
+
+    monkeypatch.setattr(main, "_abbyy_recognize", fake_recognize)
+    monkeypatch.setattr(main, "_page_subset", lambda file_path, pages, work_dir: os.path.join(work_dir, "subset.pdf"))
+
+    source = tmp_path / "bundle.pdf"
+    source.write_bytes(b"%PDF-1.4")
+    result = main.abbyy_ocr_result(str(source), mode="adaptive")
+
+    assert result["error"] is None
+    assert result["escalated_pages"] == [1]
+    assert passes == [("bundle.pdf", "Fast"), ("subset.pdf", "Accurate")]
+    assert result["text"].split("\n\n")[0] == "AB"
+
+def test_parse_abbyy_xml_aggregates_pages_and_lines(tmp_path):
+    xml_file = tmp_path / "export.xml"
+    xml_file.write_text(
+        '<document xmlns="http://www.abbyy.com/FineReader_xml/FineReader10-schema-v1.xml">'
+        '<page><block><par>'
+        '<line><char confidence="100">a</char><char confidence="80">b</char></line>'
+        '<line><char confidence="60">c</char></line>'
+        '</par></block></page>'
+        '<page><block><par><line><char>d</char></line></par></block></page>'
+        '</document>',
+        encoding="utf-8"
+    )
+    parsed = main.parse_abbyy_xml(str(xml_file))
+    assert parsed["text"] == "ab\nc\n\nd"
+    assert parsed["confidence"] == 80.0
+    first, second = parsed["pages"]
+    assert (first["confidence"], first["chars"]) == (80.0, 3)
+    assert [line["confidence"] for line in first["lines"]] == [90.0, 60.0]
+    assert (second["confidence"], second["chars"]) == (0.0, 0)
+    assert main.parse_confidence_from_xml(str(xml_file)) == 80.0
+
+def test_text_layer_confidence_uses_the_requested_engines_scale(monkeypatch, tmp_path):
+    pdf = tmp_path / "letter.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    monkeypatch.setattr(main, "born_digital_text", lambda path: "embedded text")
+    client = main.app.test_client()
+
+    abbyy = client.post("/api/process", json={"file_path": str(pdf), "engine": "abbyy"}).get_json()
+    google = client.post("/api/process_batch", json={"file_paths": [str(pdf)], "engine": "google"}).get_json()
+
+    assert (abbyy["source"], abbyy["confidence"]) == ("text_layer", 100.0)
+    assert google["results"][0]["confidence"] == 1.0
+
+def test_unknown_engine_is_rejected_before_the_text_layer_shortcut(monkeypatch, tmp_path):
+    pdf = tmp_path / "letter.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    monkeypatch.setattr(main, "born_digital_text", lambda path: "embedded text")
+    client = main.app.test_client()
+
+    single = client.post("/api/process", json={"file_path": str(pdf), "engine": "tesseract"})
+    batch = client.post("/api/process_batch", json={"file_paths": [str(pdf)], "engine": "tesseract"}).get_json()
+
+    assert single.status_code == 400
+    assert "Unsupported OCR engine" in single.get_json()["error"]
+    assert batch["results"][0]["success"] is False
@@ -0,0 +1,47 @@
+import os
+import sys
+import asyncio
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import ocr_pdf_async
+from vision_operations import VisionOperationManager
+
+
+class FakeOperation:
+    def __init__(self, client, request):
+        self.client = client
+        self.request = request
+
+    async def result(self, timeout=None):
+        self.client.running += 1
+        self.client.peak = max(self.client.peak, self.client.running)
+        await asyncio.sleep(0.05)
+        self.client.running -= 1
+        if "broken" in self.request.input_config.gcs_source.uri:
+            raise RuntimeError("Vision rejected the file")
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+
+    async def async_batch_annotate_files(self, requests):
+        return FakeOperation(self, requests[0])
+
+def test_operations_are_capped_and_resolve_their_own_futures():
+    client = FakeAsyncClient()
+    manager = VisionOperationManager(max_in_flight=3, client_factory=lambda: client)
+    futures = [
+        manager.submit(ocr_pdf_async.build_ocr_request("bucket", f"job{i}/doc.pdf", f"ocr_results/job{i}/doc"))
+        for i in range(10)
+    ]
+    broken = manager.submit(ocr_pdf_async.build_ocr_request("bucket", "broken.pdf", "ocr_results/broken"))
+
+    assert [future.result(timeout=5) for future in futures] == [
+        f"gs://bucket/ocr_results/job{i}/doc/" for i in range(10)
+    ]
+    assert isinstance(broken.exception(timeout=5), RuntimeError)
+    assert client.peak == 3
+    assert manager.in_flight == 0
@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import time
+import threading
+from types import SimpleNamespace
+from concurrent.futures import Future
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import ocr_pdf_async
+
+
+def page_text(path):
+    with open(path) as f:
+        return json.load(f)["responses"][0]["fullTextAnnotation"]["text"].rstrip("\n")
+
+def test_all_shards_are_assembled_in_page_order():
+    shards = []
+    for n in (3, 1, 2):
+        name = f"output-{n}-to-{n}.json"
+        with open(os.path.join(ROOT_DIR, name)) as f:
+            shards.append((ocr_pdf_async.shard_page_range(name)[0], json.load(f)))
+
+    expected = "\n\n".join(page_text(os.path.join(ROOT_DIR, f"output-{n}-to-{n}.json")) for n in (1, 2, 3))
+    assert ocr_pdf_async.assemble_ocr_text(shards) == expected
+    assert ocr_pdf_async.shard_page_range("unrelated.json") is None
+
+def test_multi_page_shards_keep_their_page_numbers():
+    shard = {"responses": [
+        {"fullTextAnnotation": {"text": "four\n"}, "context": {"pageNumber": 4}},
+        {"fullTextAnnotation": {"text": "five\n"}},
+    ]}
+    first = {"responses": [{"fullTextAnnotation": {"text": "one\n"}, "context": {"pageNumber": 1}}]}
+    assert ocr_pdf_async.shard_page_range("ocr_results/x/output-4-to-5.json") == (4, 5)
+    assert ocr_pdf_async.assemble_ocr_text([(4, shard), (1, first)]) == "one\n\nfour\n\nfive"
+
+class FakeBlob:
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+        self.downloads = 0
+
+    def download_as_bytes(self):
+        self.downloads += 1
+        return self.data
+
+class FakeBucket:
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+    def list_blobs(self, prefix):
+        return [blob for blob in self.blobs if blob.name.startswith(prefix)]
+
+def test_shards_are_fetched_in_memory_and_assembled(monkeypatch, tmp_path):
+    def shard(first, last):
+        return json.dumps({"responses": [
+            {"fullTextAnnotation": {"text": f"page {n}\n"}, "context": {"pageNumber": n}}
+            for n in range(first, last + 1)
+        ]}).encode("utf-8")
+
+    blobs = [
+        FakeBlob("ocr_results/job/doc/output-3-to-4.json", shard(3, 4)),
+        FakeBlob("ocr_results/job/doc/output-1-to-2.json", shard(1, 2)),
+        FakeBlob("ocr_results/job/doc/notes.txt", b"ignored"),
+        FakeBlob("ocr_results/other/doc/output-1-to-1.json", shard(9, 9)),
+    ]
+    monkeypatch.setattr(ocr_pdf_async, "get_bucket", lambda name: FakeBucket(blobs))
+    monkeypatch.chdir(tmp_path)
+
+    text = ocr_pdf_async.fetch_ocr_text("bucket", "ocr_results/job/doc", workers=4)
+
+    assert text == "page 1\n\npage 2\n\npage 3\n\npage 4"
+    assert [blob.downloads for blob in blobs] == [1, 1, 0, 0]
+    assert os.listdir(tmp_path) == []
+
+class FakeVisionClient:
+    def __init__(self):
+        self.image_calls = []
+
+    def batch_annotate_images(self, requests):
+        self.image_calls.append(len(requests))
+        return SimpleNamespace(responses=[
+            SimpleNamespace(
+                error=SimpleNamespace(message=""),
+                full_text_annotation=SimpleNamespace(text=request.image.content.decode("utf-8"))
+            )
+            for request in requests
+        ])
+
+def test_images_are_sent_inline_in_groups_and_large_files_via_gcs(monkeypatch, tmp_path):
+    client = FakeVisionClient()
+    monkeypatch.setattr(ocr_pdf_async, "get_vision_client", lambda: client)
+    monkeypatch.setattr(ocr_pdf_async, "VISION_INLINE_MAX_BYTES", 100)
+    via_gcs = []
+    monkeypatch.setattr(
+        ocr_pdf_async, "google_ocr_documents",
+        lambda bucket, paths: via_gcs.extend(paths) or [("from gcs", None) for _ in paths]
+    )
+    paths = []
+    for i in range(18):
+        image = tmp_path / f"scan{i}.jpg"
+        image.write_bytes(f"scan {i}".encode("utf-8"))
+        paths.append(str(image))
+    large = tmp_path / "bundle.pdf"
+    large.write_bytes(b"%PDF" + b"0" * 200)
+    paths.insert(5, str(large))
+
+    results = ocr_pdf_async.google_ocr_files("bucket", paths)
+
+    assert client.image_calls == [16, 2]
+    assert via_gcs == [str(large)]
+    assert results[5] == ("from gcs", None)
+    assert [text for text, _ in results[:5] + results[6:]] == [f"scan {i}" for i in range(18)]
+
+def test_image_groups_are_capped_by_total_bytes(monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_pdf_async, "VISION_REQUEST_MAX_BYTES", 100)
+    paths = []
+    for i, size in enumerate((40, 40, 40, 150, 10)):
+        image = tmp_path / f"scan{i}.png"
+        image.write_bytes(b"0" * size)
+        paths.append(str(image))
+
+    groups = ocr_pdf_async.image_groups(paths)
+
+    assert [[os.path.basename(p) for p in group] for group in groups] == [
+        ["scan0.png", "scan1.png"], ["scan2.png"], ["scan3.png"], ["scan4.png"]
+    ]
+
+def test_oversize_images_stay_inline_and_are_downscaled(monkeypatch, tmp_path):
+    from PIL import Image
+
+    image = tmp_path / "photo.png"
+    Image.effect_noise((400, 400), 100).save(image)
+    monkeypatch.setattr(ocr_pdf_async, "VISION_INLINE_MAX_BYTES", 1000)
+    monkeypatch.setattr(ocr_pdf_async, "VISION_IMAGE_MAX_BYTES", 20000)
+
+    assert ocr_pdf_async.inline_kind(str(image)) == "image"
+    content = ocr_pdf_async.image_content(str(image))
+    assert len(content) <= 20000
+    assert content[:2] == b"\xff\xd8"
+
+def test_nothing_to_send_starts_no_client_or_gcs_documents(monkeypatch):
+    def unexpected(*args):
+        raise AssertionError("should not be called")
+    monkeypatch.setattr(ocr_pdf_async, "get_vision_client", unexpected)
+    monkeypatch.setattr(ocr_pdf_async, "google_ocr_documents", unexpected)
+
+    assert ocr_pdf_async.google_ocr_files("bucket", []) == []
+
+def test_long_pdfs_are_recognized_as_concurrent_chunks_merged_in_order(monkeypatch, tmp_path):
+    pdf = tmp_path / "bundle.pdf"
+    pdf.write_bytes(b"%PDF")
+    monkeypatch.setattr(ocr_pdf_async, "VISION_CHUNK_PAGES", 2)
+    monkeypatch.setattr(ocr_pdf_async, "_pdf_page_count", lambda path: 5)
+
+    def fake_split(pdf_path, chunk_pages, out_dir):
+        chunks = [os.path.join(out_dir, f"bundle-part{n:03d}.pdf") for n in (1, 2, 3)]
+        for chunk in chunks:
+            open(chunk, "wb").close()
+        return chunks
+
+    def fake_submit(bucket, blob_name, output_prefix):
+        events.append("submit")
+        future = Future()
+        future.set_result(f"gs://{bucket}/{output_prefix}/")
+        return future
+
+    def fake_fetch(bucket, output_prefix):
+        events.append("fetch")
+        return f"text of {output_prefix.rsplit('/', 1)[-1]}"
+
+    events, uploads, deleted = [], [], []
+    monkeypatch.setattr(ocr_pdf_async, "split_pdf", fake_split)
+    monkeypatch.setattr(ocr_pdf_async, "upload_gcs_file", lambda bucket, path, name: uploads.append(name) or True)
+    monkeypatch.setattr(ocr_pdf_async, "submit_ocr_pdf", fake_submit)
+    monkeypatch.setattr(ocr_pdf_async, "fetch_ocr_text", fake_fetch)
+    monkeypatch.setattr(
+        ocr_pdf_async.gcs_cleanup, "schedule_delete", lambda bucket, prefix: deleted.append(prefix)
+    )
+
+    [(text, error)] = ocr_pdf_async.google_ocr_documents("bucket", [str(pdf)])
+
+    assert error is None
+    assert text == "text of bundle-part001\n\ntext of bundle-part002\n\ntext of bundle-part003"
+    assert events == ["submit"] * 3 + ["fetch"] * 3
+    assert sorted(name.split("/", 1)[1] for name in uploads) == [f"bundle-part{n:03d}.pdf" for n in (1, 2, 3)]
+    token = uploads[0].split("/", 1)[0]
+    assert deleted == [f"{token}/", f"ocr_results/{token}/"]
+
+def fake_stages(monkeypatch, threads=None, delay=0.1):
+    def upload(bucket, job):
+        time.sleep(delay)
+        job["blob_names"] = [f"t/{job['file_path']}"]
+        if threads is not None:
+            threads.append(threading.current_thread())
+
+    def submit(bucket, blob_name, output_prefix):
+        future = Future()
+        threading.Timer(delay, future.set_result, args=(f"gs://{bucket}/{output_prefix}/",)).start()
+        return future
+
+    def fetch(bucket, job):
+        time.sleep(delay)
+        job["text"] = f"text of {job['file_path']}"
+        if threads is not None:
+            threads.append(threading.current_thread())
+
+    monkeypatch.setattr(ocr_pdf_async, "_stage_executors", {})
+    monkeypatch.setattr(ocr_pdf_async, "_upload_document", upload)
+    monkeypatch.setattr(ocr_pdf_async, "submit_ocr_pdf", submit)
+    monkeypatch.setattr(ocr_pdf_async, "_fetch_document", fetch)
+
+def test_documents_overlap_across_pipeline_stages(monkeypatch):
+    fake_stages(monkeypatch)
+    paths = [f"doc{n}.pdf" for n in range(6)]
+
+    started = time.monotonic()
+    results = ocr_pdf_async.google_ocr_documents("bucket", paths)
+    elapsed = time.monotonic() - started
+
+    assert results == [(f"text of {path}", None) for path in paths]
+    # Strictly sequential would take 6 x 3 x 0.1s
+    assert elapsed < 1.0
+
+def test_single_document_runs_in_the_calling_thread(monkeypatch):
+    threads = []
+    fake_stages(monkeypatch, threads, delay=0)
+
+    assert ocr_pdf_async.google_ocr_documents("bucket", ["letter.pdf"]) == [("text of letter.pdf", None)]
+    assert threads == [threading.current_thread()] * 2
+    assert ocr_pdf_async._stage_executors == {}
+
+def test_failed_part_waits_for_the_other_parts(monkeypatch):
+    failed, slow = Future(), Future()
+    failed.set_exception(RuntimeError("quota exceeded"))
+    futures = iter([failed, slow])
+    monkeypatch.setattr(ocr_pdf_async, "submit_ocr_pdf", lambda bucket, blob_name, output_prefix: next(futures))
+    job = {"file_path": "bundle.pdf", "error": None, "blob_names": ["t/part1.pdf", "t/part2.pdf"]}
+    recognized = []
+
+    ocr_pdf_async._recognize_document("bucket", job, recognized.append)
+    assert recognized == []
+    slow.set_result("gs://bucket/out/")
+
+    assert recognized == [job]
+    assert job["error"] == "Failed to process OCR"
+
+def test_upload_limit_holds_across_concurrent_batches(monkeypatch):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def fake_upload(bucket, job):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        job["error"] = "stop here"
+
+    monkeypatch.setattr(ocr_pdf_async, "_stage_executors", {})
+    monkeypatch.setattr(ocr_pdf_async, "VISION_PIPELINE_UPLOADERS", 2)
+    monkeypatch.setattr(ocr_pdf_async, "_upload_document", fake_upload)
+    monkeypatch.setattr(ocr_pdf_async, "_fetch_document", lambda bucket, job: None)
+    batches = [[f"doc{b}-{n}.pdf" for n in range(4)] for b in range(3)]
+    threads = [threading.Thread(target=ocr_pdf_async.google_ocr_documents, args=("bucket", paths)) for paths in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 2
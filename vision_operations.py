@@ -0,0 +1,71 @@
+"""Asyncio manager for Google Vision async file operations.
+
+Blocking on operation.result() holds a thread for the whole Vision job. Instead,
+operations are started and polled on one asyncio event loop running in a
+background thread, with at most VISION_MAX_IN_FLIGHT operations outstanding at a
+time. Callers get a concurrent.futures.Future per job, so a single process can
+track hundreds of pending cloud jobs with one thread.
+"""
+import os
+import asyncio
+import logging
+import threading
+
+from google.cloud import vision_v1
+
+logger = logging.getLogger(__name__)
+
+# Vision operations running at once per process; further jobs wait their turn.
+VISION_MAX_IN_FLIGHT = max(1, int(os.environ.get("VISION_MAX_IN_FLIGHT", "20")))
+VISION_OPERATION_TIMEOUT = 600
+
+class VisionOperationManager:
+    """Submits AsyncAnnotateFileRequests and resolves a Future when each finishes."""
+
+    def __init__(self, max_in_flight=None, client_factory=None, timeout=None):
+        self.max_in_flight = max_in_flight or VISION_MAX_IN_FLIGHT
+        self.client_factory = client_factory or vision_v1.ImageAnnotatorAsyncClient
+        self.timeout = timeout or VISION_OPERATION_TIMEOUT
+        self.in_flight = 0
+        self._client = None
+        self._semaphore = None
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._run_loop, args=(ready,), name="vision-operations", daemon=True).start()
+        ready.wait()
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        ready.set()
+        self.loop.run_forever()
+
+    def submit(self, request):
+        """Queue a request; the Future resolves to its output URI or raises the operation's error."""
+        return asyncio.run_coroutine_threadsafe(self._run(request), self.loop)
+
+    async def _run(self, request):
+        async with self._semaphore:
+            # The async client is bound to this loop, so it is created on it.
+            if self._client is None:
+                self._client = self.client_factory()
+            self.in_flight += 1
+            try:
+                operation = await self._client.async_batch_annotate_files(requests=[request])
+                await operation.result(timeout=self.timeout)
+                output_uri = request.output_config.gcs_destination.uri
+                logger.info(f"Vision operation for {request.input_config.gcs_source.uri} wrote {output_uri}")
+                return output_uri
+            finally:
+                self.in_flight -= 1
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_operation_manager():
+    """Return the process-wide VisionOperationManager, starting it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = VisionOperationManager()
+        return _manager